@@ -0,0 +1,241 @@
+from contextlib import contextmanager
+import os
+import re
+import sqlite3
+import time
+
+import psycopg
+from psycopg import IsolationLevel
+
+from scenarios import Outcome, explore
+
+NAMED_PARAMETER = re.compile(r"%\((\w+)\)s")
+
+
+class PostgresBackend:
+    name = "postgres"
+    isolation_levels = {
+        "read uncommitted": IsolationLevel.READ_UNCOMMITTED,
+        "read committed": IsolationLevel.READ_COMMITTED,
+        "repeatable read": IsolationLevel.REPEATABLE_READ,
+        "serializable": IsolationLevel.SERIALIZABLE,
+    }
+
+    def __init__(self, conninfo):
+        self.conninfo = conninfo
+
+    def connect(self, isolation="read committed"):
+        conn = psycopg.connect(self.conninfo)
+        conn.isolation_level = self.isolation_levels[isolation]
+        return conn
+
+    def prepare(self, statement):
+        return statement
+
+    @contextmanager
+    def transaction(self, conn):
+        with conn.transaction():
+            yield conn
+
+    def classify(self, error):
+        if isinstance(error, psycopg.errors.SerializationFailure):
+            return "serialization"
+        if isinstance(error, psycopg.errors.DeadlockDetected):
+            return "deadlock"
+        if isinstance(error, psycopg.errors.LockNotAvailable):
+            return "busy"
+        if isinstance(error, (psycopg.IntegrityError, psycopg.DataError, psycopg.errors.DatatypeMismatch)):
+            return "constraint"
+        return None
+
+    def explore(self, scenario):
+        return explore(self.conninfo, scenario, workers=4)
+
+
+class SqliteBackend:
+    isolation_levels = {
+        "read uncommitted": "serializable",
+        "read committed": "serializable",
+        "repeatable read": "serializable",
+        "serializable": "serializable",
+    }
+    schema = "CREATE TABLE IF NOT EXISTS employee (id INTEGER PRIMARY KEY, name TEXT, salary REAL) STRICT"
+
+    def __init__(self, path, journal_mode="wal", synchronous="full", busy_timeout=5.0):
+        self.path = path
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.busy_timeout = busy_timeout
+        self.name = f"sqlite-{journal_mode}"
+        conn = self.connect()
+        try:
+            conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+            conn.execute(self.schema)
+        finally:
+            conn.close()
+
+    def connect(self, isolation="serializable", busy_timeout=None):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout if busy_timeout is None else busy_timeout, isolation_level=None, check_same_thread=False)
+        conn.execute(f"PRAGMA synchronous = {self.synchronous}")
+        return conn
+
+    def prepare(self, statement):
+        return NAMED_PARAMETER.sub(r":\1", statement).replace("%s", "?")
+
+    @contextmanager
+    def transaction(self, conn):
+        conn.execute("BEGIN")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def classify(self, error):
+        if isinstance(error, sqlite3.IntegrityError):
+            return "constraint"
+        if isinstance(error, sqlite3.OperationalError):
+            if getattr(error, "sqlite_errorname", "") == "SQLITE_BUSY_SNAPSHOT":
+                return "serialization"
+            if getattr(error, "sqlite_errorname", "").startswith(("SQLITE_BUSY", "SQLITE_LOCKED")):
+                return "busy"
+        return None
+
+    def explore(self, scenario):
+        return explore_locally(self, scenario)
+
+
+def retryable(backend, error):
+    return backend.classify(error) in ("serialization", "deadlock", "busy")
+
+
+def reset(backend, rows):
+    conn = backend.connect()
+    try:
+        with backend.transaction(conn):
+            cur = conn.cursor()
+            cur.execute("DELETE FROM employee")
+            cur.executemany(backend.prepare("INSERT INTO employee (id, name, salary) VALUES (%s, %s, %s)"), rows)
+    finally:
+        conn.close()
+
+
+def execute_step(backend, conn, statement, values):
+    if statement.upper() in ("COMMIT", "ROLLBACK"):
+        conn.execute(statement)
+        return
+    if not conn.in_transaction:
+        conn.execute("BEGIN")
+    cur = conn.execute(backend.prepare(statement), values if "%(" in statement else ())
+    if cur.description is not None:
+        row = cur.fetchone()
+        if row is not None:
+            values.update(zip([column[0] for column in cur.description], row))
+
+
+def run_locally(backend, scenario, order):
+    connections = {name: backend.connect(busy_timeout=0) for name in scenario.transactions}
+    try:
+        reset(backend, scenario.rows)
+        positions = {name: 0 for name in scenario.transactions}
+        statuses = {name: "running" for name in scenario.transactions}
+        values = {name: {} for name in scenario.transactions}
+        blocked = []
+        deferred = {name: 0 for name in scenario.transactions}
+        executed = []
+
+        def step(name):
+            index = positions[name]
+            statement = scenario.transactions[name][index]
+            try:
+                execute_step(backend, connections[name], statement, values[name])
+            except sqlite3.Error as error:
+                if backend.classify(error) == "busy":
+                    return False
+                statuses[name] = f"aborted ({getattr(error, 'sqlite_errorname', type(error).__name__)})"
+                if connections[name].in_transaction:
+                    connections[name].execute("ROLLBACK")
+            else:
+                if statement.upper() in ("COMMIT", "ROLLBACK"):
+                    statuses[name] = "committed" if statement.upper() == "COMMIT" else "rolled back"
+            executed.append((name, index))
+            positions[name] += 1
+            return True
+
+        def unblock():
+            progress = True
+            while progress:
+                progress = False
+                for name in list(blocked):
+                    if not step(name):
+                        continue
+                    blocked.remove(name)
+                    progress = True
+                    while deferred[name] and statuses[name] == "running":
+                        deferred[name] -= 1
+                        if not step(name):
+                            blocked.append(name)
+                            break
+
+        for name in order:
+            if statuses[name] != "running":
+                continue
+            if name in blocked:
+                deferred[name] += 1
+            elif step(name):
+                unblock()
+            else:
+                blocked.append(name)
+        while blocked:
+            victim = next((name for name in reversed(blocked) if scenario.transactions[name][positions[name]].upper() != "COMMIT"), blocked[-1])
+            blocked.remove(victim)
+            statuses[victim] = "aborted (SQLITE_BUSY deadlock)"
+            connections[victim].execute("ROLLBACK")
+            unblock()
+
+        final = connections[next(iter(connections))].execute(scenario.final).fetchall()
+        outcome = Outcome(tuple(order), executed, statuses, values, [tuple(row) for row in final])
+        outcome.held = bool(scenario.invariant(outcome))
+        return outcome
+    finally:
+        for conn in connections.values():
+            conn.close()
+
+
+class LocalExploration:
+
+    def __init__(self, scenario, runs, outcomes, seconds):
+        self.scenario = scenario
+        self.runs = runs
+        self.outcomes = outcomes
+        self.seconds = seconds
+
+    @property
+    def violations(self):
+        return [outcome for outcome in self.outcomes if not outcome.held]
+
+
+def interleavings(remaining):
+    if not any(remaining.values()):
+        yield ()
+        return
+    for name, count in remaining.items():
+        if count:
+            for rest in interleavings({**remaining, name: count - 1}):
+                yield (name, *rest)
+
+
+def explore_locally(backend, scenario):
+    started = time.perf_counter()
+    outcomes = {}
+    runs = 0
+    for order in interleavings({name: len(statements) for name, statements in scenario.transactions.items()}):
+        runs += 1
+        outcome = run_locally(backend, scenario, order)
+        outcomes.setdefault((tuple(outcome.executed), tuple(sorted(outcome.statuses.items()))), outcome)
+    return LocalExploration(scenario, runs, list(outcomes.values()), time.perf_counter() - started)
+
+
+def sqlite_path(directory, journal_mode):
+    return os.path.join(directory, f"employee-{journal_mode}.db")
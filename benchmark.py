@@ -0,0 +1,163 @@
+from contextlib import AsyncExitStack, ExitStack, contextmanager
+from threading import Barrier, Thread
+import asyncio
+import math
+import time
+
+from psycopg import IsolationLevel
+
+from postgres_session import session
+from retry import RETRYABLE_ERRORS
+
+ISOLATION_LEVELS = {
+    "read committed": IsolationLevel.READ_COMMITTED,
+    "repeatable read": IsolationLevel.REPEATABLE_READ,
+    "serializable": IsolationLevel.SERIALIZABLE,
+}
+
+
+@contextmanager
+def benchmark_database(postgres=session):
+    postgres.start()
+    database = postgres.create_database()
+    try:
+        yield postgres.connection_uri(database)
+    finally:
+        postgres.drop_database(database)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(max(math.ceil(fraction * len(ordered)) - 1, 0), len(ordered) - 1)]
+
+
+def collect(clients, seconds, results):
+    return {
+        "clients": clients,
+        "seconds": seconds,
+        "commits": sum(result["commits"] for result in results),
+        "aborts": sum(result["aborts"] for result in results),
+        "observed": sum(result["observed"] for result in results),
+        "latencies": [latency for result in results for latency in result["latencies"]],
+    }
+
+
+def run_clients(pool, clients, duration, transaction, isolation_level=None, runner=None, hold_connections=True, retryable=RETRYABLE_ERRORS, ready=None, record=None):
+    deadline = []
+
+    def start():
+        if ready is not None:
+            ready()
+        deadline.append(time.perf_counter() + duration)
+
+    barrier = Barrier(clients, action=start)
+    results = [{"commits": 0, "aborts": 0, "latencies": [], "observed": 0} for _ in range(clients)]
+
+    def attempt(conn, number):
+        if runner is not None:
+            return runner.run(conn, transaction, number)
+        with conn.transaction():
+            return transaction(conn, number)
+
+    def client(number):
+        result = results[number]
+        with ExitStack() as stack:
+            if hold_connections:
+                conn = stack.enter_context(pool.connection())
+                conn.isolation_level = isolation_level
+            barrier.wait()
+            while time.perf_counter() < deadline[0]:
+                started = time.perf_counter()
+                try:
+                    if hold_connections:
+                        observed = attempt(conn, number)
+                    else:
+                        with pool.connection() as conn:
+                            conn.isolation_level = isolation_level
+                            observed = attempt(conn, number)
+                except retryable:
+                    result["aborts"] += 1
+                    continue
+                if record is None:
+                    result["latencies"].append(time.perf_counter() - started)
+                else:
+                    record(number, time.perf_counter() - started)
+                result["commits"] += 1
+                result["observed"] += observed or 0
+
+    started = time.perf_counter()
+    threads = [Thread(target=client, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return collect(clients, time.perf_counter() - started, results)
+
+
+async def run_async_clients(pool, clients, duration, transaction, isolation_level=None, hold_connections=True, retryable=RETRYABLE_ERRORS):
+    ready = asyncio.Event()
+    waiting = [clients]
+    deadline = []
+    results = [{"commits": 0, "aborts": 0, "latencies": [], "observed": 0} for _ in range(clients)]
+
+    async def attempt(conn, number):
+        async with conn.transaction():
+            return await transaction(conn, number)
+
+    async def client(number):
+        result = results[number]
+        async with AsyncExitStack() as stack:
+            if hold_connections:
+                conn = await stack.enter_async_context(pool.connection())
+                await conn.set_isolation_level(isolation_level)
+            waiting[0] -= 1
+            if not waiting[0]:
+                deadline.append(time.perf_counter() + duration)
+                ready.set()
+            await ready.wait()
+            while time.perf_counter() < deadline[0]:
+                started = time.perf_counter()
+                try:
+                    if hold_connections:
+                        observed = await attempt(conn, number)
+                    else:
+                        async with pool.connection() as conn:
+                            await conn.set_isolation_level(isolation_level)
+                            observed = await attempt(conn, number)
+                except retryable:
+                    result["aborts"] += 1
+                    continue
+                result["latencies"].append(time.perf_counter() - started)
+                result["commits"] += 1
+                result["observed"] += observed or 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(clients)))
+    return collect(clients, time.perf_counter() - started, results)
+
+
+def summarize(run):
+    attempts = run["commits"] + run["aborts"]
+    return {
+        "clients": run["clients"],
+        "tps": run["commits"] / run["seconds"] if run["seconds"] else 0.0,
+        "p50_ms": percentile(run["latencies"], 0.50) * 1000,
+        "p99_ms": percentile(run["latencies"], 0.99) * 1000,
+        "abort_rate": run["aborts"] / attempts if attempts else 0.0,
+    }
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return f"{value:.3f}" if abs(value) < 10 else f"{value:.1f}"
+    return str(value)
+
+
+def print_table(rows, columns):
+    cells = [[format_value(row.get(column, "")) for column in columns] for row in rows]
+    widths = [max([len(column)] + [len(line[index]) for line in cells]) for index, column in enumerate(columns)]
+    print("  ".join(column.rjust(width) for column, width in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.rjust(width) for cell, width in zip(line, widths)))
@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import os
+import time
+
+from benchmark import ISOLATION_LEVELS, benchmark_database, print_table, run_async_clients, run_clients, summarize
+from benchmark_isolation import LostUpdateWorkload
+from connection_pool import create_async_pool, create_pool
+from load_generator import run_processes, summarize_histogram
+
+
+def measure(function):
+    started = time.process_time()
+    run = function()
+    run["cpu_pct"] = 100 * (time.process_time() - started) / run["seconds"]
+    return run
+
+
+async def run_async(conninfo, workload, clients, connections, duration, isolation_level, hold_connections):
+    pool = await create_async_pool(conninfo, min_size=connections, max_size=connections)
+    async with pool:
+        return await run_async_clients(pool, clients, duration, workload.async_transaction, isolation_level, hold_connections)
+
+
+def run_benchmark(conninfo, engines, clients, connections, duration, isolation_level, rows, processes=None):
+    workload = LostUpdateWorkload(rows)
+    results = []
+    for client_count in clients:
+        pool_size = min(client_count, connections)
+        hold_connections = client_count <= connections
+        for engine in engines:
+            with create_pool(conninfo) as pool:
+                with pool.connection() as conn:
+                    workload.setup(conn)
+            if engine == "processes":
+                run = run_processes(conninfo, workload.name, rows, client_count, processes or os.cpu_count(), duration, isolation_level, connections)
+                results.append({"engine": engine, "connections": pool_size, **summarize_histogram(run), "cpu_pct": run["cpu_pct"]})
+                continue
+            if engine == "threads":
+                def function():
+                    with create_pool(conninfo, min_size=pool_size, max_size=pool_size) as pool:
+                        return run_clients(pool, client_count, duration, workload.transaction, ISOLATION_LEVELS[isolation_level], hold_connections=hold_connections)
+            else:
+                def function():
+                    return asyncio.run(run_async(conninfo, workload, client_count, pool_size, duration, ISOLATION_LEVELS[isolation_level], hold_connections))
+            run = measure(function)
+            results.append({"engine": engine, "connections": pool_size, **summarize(run), "cpu_pct": run["cpu_pct"]})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare thread-per-client, asyncio and multi-process clients on the read-modify-write salary update")
+    parser.add_argument("--engine", nargs="+", choices=["threads", "asyncio", "processes"], default=["threads", "asyncio", "processes"])
+    parser.add_argument("--clients", nargs="+", type=int, default=[16, 64, 256, 1024, 4096])
+    parser.add_argument("--connections", type=int, default=64, help="pool size; clients beyond it check out a connection per transaction")
+    parser.add_argument("--duration", type=float, default=5, help="seconds per measurement")
+    parser.add_argument("--processes", type=int, default=os.cpu_count(), help="load generator processes for the processes engine, each with its own connections")
+    parser.add_argument("--isolation", choices=list(ISOLATION_LEVELS), default="read committed")
+    parser.add_argument("--rows", type=int, default=1000, help="rows the clients update")
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        results = run_benchmark(conninfo, args.engine, args.clients, args.connections, args.duration, args.isolation, args.rows, args.processes)
+    print_table(results, ["engine", "clients", "connections", "tps", "p50_ms", "p99_ms", "abort_rate", "cpu_pct"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+from threading import Event, Thread
+import argparse
+import time
+
+import psycopg
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+from benchmark import benchmark_database, print_table, run_clients, summarize
+from connection_pool import create_pool
+from crash_recovery import wait_until_ready
+from postgres_session import session
+
+
+def settings_options(synchronous_commit, commit_delay, commit_siblings):
+    return f"-c synchronous_commit={synchronous_commit} -c commit_delay={commit_delay} -c commit_siblings={commit_siblings}"
+
+
+def insert_employee(conn, client):
+    conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", (f"Employee {client}", 3000))
+
+
+def count_lost_commits(server, connection_uri, options, clients, crash_after):
+    acknowledged = [[] for _ in range(clients)]
+    stop = Event()
+
+    def client(number):
+        try:
+            with psycopg.connect(make_conninfo(connection_uri(), options=options)) as conn:
+                while not stop.is_set():
+                    cur = conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", (f"Employee {number}", 3000))
+                    id_employee, = cur.fetchone()
+                    conn.commit()
+                    acknowledged[number].append(id_employee)
+        except psycopg.OperationalError:
+            pass
+
+    threads = [Thread(target=client, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(crash_after)
+    server.crash()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    server.restart()
+    wait_until_ready(connection_uri)
+
+    ids = [id_employee for ids in acknowledged for id_employee in ids]
+    with psycopg.connect(connection_uri()) as conn:
+        cur = conn.execute("SELECT count(*) FROM employee WHERE id = ANY(%s)", (ids,))
+        survived, = cur.fetchone()
+    return len(ids), len(ids) - survived
+
+
+def run_benchmark(connection_uri, synchronous_commits, commit_delays, commit_siblings, clients, duration, server=None, crash_after=1.0):
+    results = []
+    for synchronous_commit in synchronous_commits:
+        for commit_delay in commit_delays:
+            options = settings_options(synchronous_commit, commit_delay, commit_siblings)
+            for client_count in clients:
+                with create_pool(make_conninfo(connection_uri(), options=options), min_size=client_count, max_size=client_count) as pool:
+                    run = run_clients(pool, client_count, duration, insert_employee)
+                result = {"synchronous_commit": synchronous_commit, "commit_delay": commit_delay, "commit_siblings": commit_siblings, **summarize(run)}
+                if server is not None:
+                    result["acknowledged"], result["lost"] = count_lost_commits(server, connection_uri, options, client_count, crash_after)
+                results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Commit latency and throughput on the employee table under different durability settings")
+    parser.add_argument("--synchronous-commit", nargs="+", choices=["on", "off", "local"], default=["on", "off"], help="local waits for the same local WAL flush as on unless a synchronous standby is configured")
+    parser.add_argument("--commit-delay", nargs="+", type=int, default=[0, 1000], help="microseconds")
+    parser.add_argument("--commit-siblings", type=int, default=5)
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=5, help="seconds per measurement")
+    parser.add_argument("--crash", action="store_true", help="also SIGKILL the server under load and count acknowledged commits that were lost")
+    parser.add_argument("--crash-after", type=float, default=1.0, help="seconds of load before the crash")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.crash:
+        server = session.start().crash_server()
+        if server is None:
+            parser.error("--crash needs the Postgres container owned by this session")
+    # commit latency only means something with fsync on, so the fast profile's server is never measured
+    durable = session.start().durable_session()
+    with benchmark_database(durable) as conninfo:
+        database = conninfo_to_dict(conninfo)["dbname"]
+        results = run_benchmark(lambda: durable.connection_uri(database), args.synchronous_commit, args.commit_delay, args.commit_siblings, args.clients, args.duration, server, args.crash_after)
+    columns = ["synchronous_commit", "commit_delay", "commit_siblings", "clients", "tps", "p50_ms", "p99_ms"]
+    if args.crash:
+        columns += ["acknowledged", "lost"]
+    print_table(results, columns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+from contextlib import ExitStack
+from threading import Barrier, Thread
+import argparse
+import random
+import tempfile
+import time
+
+from backends import PostgresBackend, SqliteBackend, reset, retryable, sqlite_path
+from benchmark import benchmark_database, collect, percentile, print_table, summarize
+from isolation_scenarios import SCENARIOS
+
+ENGINES = ["postgres", "sqlite-wal", "sqlite-delete"]
+
+
+def create_backend(engine, stack):
+    if engine == "postgres":
+        return PostgresBackend(stack.enter_context(benchmark_database()))
+    journal_mode = engine.split("-", 1)[1]
+    return SqliteBackend(sqlite_path(stack.enter_context(tempfile.TemporaryDirectory()), journal_mode), journal_mode)
+
+
+def insert_employee(backend, conn, number):
+    with backend.transaction(conn):
+        conn.execute(backend.prepare("INSERT INTO employee (name, salary) VALUES (%s, %s)"), (f"Employee {number}", 3000))
+
+
+def raise_salary(backend, conn, rows):
+    id_employee = random.randint(1, rows)
+    with backend.transaction(conn):
+        salary, = conn.execute(backend.prepare("SELECT salary FROM employee WHERE id = %s"), (id_employee,)).fetchone()
+        conn.execute(backend.prepare("UPDATE employee SET salary = %s WHERE id = %s"), (salary + 1, id_employee))
+
+
+def total_salary(backend):
+    conn = backend.connect()
+    try:
+        total, = conn.execute("SELECT SUM(salary) FROM employee").fetchone()
+        conn.commit()
+    finally:
+        conn.close()
+    return total
+
+
+def commit_latency(backend, repeats):
+    reset(backend, [])
+    conn = backend.connect()
+    latencies = []
+    try:
+        for number in range(repeats):
+            started = time.perf_counter()
+            insert_employee(backend, conn, number)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+    return {"engine": backend.name, "commit_p50_ms": percentile(latencies, 0.50) * 1000, "commit_p99_ms": percentile(latencies, 0.99) * 1000}
+
+
+def concurrent_writers(backend, clients, duration, rows, isolation):
+    reset(backend, [(number, f"Employee {number}", 3000) for number in range(1, rows + 1)])
+    initial_total = total_salary(backend)
+    deadline = []
+    barrier = Barrier(clients, action=lambda: deadline.append(time.perf_counter() + duration))
+    results = [{"commits": 0, "aborts": 0, "latencies": [], "observed": 0} for _ in range(clients)]
+
+    def client(number):
+        result = results[number]
+        conn = backend.connect(isolation)
+        try:
+            barrier.wait()
+            while time.perf_counter() < deadline[0]:
+                started = time.perf_counter()
+                try:
+                    raise_salary(backend, conn, rows)
+                except Exception as error:
+                    if not retryable(backend, error):
+                        raise
+                    result["aborts"] += 1
+                    continue
+                result["latencies"].append(time.perf_counter() - started)
+                result["commits"] += 1
+        finally:
+            conn.close()
+
+    started = time.perf_counter()
+    threads = [Thread(target=client, args=(number,)) for number in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    run = collect(clients, time.perf_counter() - started, results)
+    return {"engine": backend.name, **summarize(run), "lost": run["commits"] - int(total_salary(backend) - initial_total)}
+
+
+def anomalies(backend, scenarios):
+    results = []
+    for scenario in scenarios:
+        exploration = backend.explore(scenario)
+        results.append({
+            "engine": backend.name,
+            "scenario": scenario.name,
+            "outcomes": len(exploration.outcomes),
+            "aborted": sum(1 for outcome in exploration.outcomes if len(outcome.committed) < len(scenario.transactions)),
+            "violations": len(exploration.violations),
+            "allowed": "yes" if exploration.violations else "no",
+        })
+    return results
+
+
+def side_by_side(rows, engines):
+    table = {}
+    for row in rows:
+        table.setdefault(row["scenario"], {"scenario": row["scenario"]})[row["engine"]] = f"{row['allowed']} ({row['violations']}/{row['outcomes']})"
+    return list(table.values())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the same commit, concurrent-writer and isolation scenarios against Postgres and SQLite")
+    parser.add_argument("--engine", nargs="+", choices=ENGINES, default=ENGINES)
+    parser.add_argument("--repeats", type=int, default=500, help="single-row commits timed per engine")
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 4, 16])
+    parser.add_argument("--duration", type=float, default=3, help="seconds per concurrent-writer measurement")
+    parser.add_argument("--rows", type=int, default=100, help="rows the writers update")
+    parser.add_argument("--isolation", default="serializable", choices=list(PostgresBackend.isolation_levels), help="Postgres isolation level for the writers; SQLite is always serializable")
+    parser.add_argument("--scenarios", nargs="*", help="isolation scenario names (default: all)")
+    args = parser.parse_args(argv)
+
+    scenarios = [scenario for scenario in SCENARIOS if not args.scenarios or scenario.name in args.scenarios]
+    latencies, throughput, observed = [], [], []
+    with ExitStack() as stack:
+        for engine in args.engine:
+            backend = create_backend(engine, stack)
+            latencies.append(commit_latency(backend, args.repeats))
+            for clients in args.clients:
+                throughput.append(concurrent_writers(backend, clients, args.duration, args.rows, args.isolation))
+            observed.extend(anomalies(backend, scenarios))
+
+    print_table(latencies, ["engine", "commit_p50_ms", "commit_p99_ms"])
+    print()
+    print_table(throughput, ["engine", "clients", "tps", "p50_ms", "p99_ms", "abort_rate", "lost"])
+    print()
+    print_table(side_by_side(observed, args.engine), ["scenario", *args.engine])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import random
+
+import psycopg
+
+from benchmark import ISOLATION_LEVELS, benchmark_database, percentile, print_table, run_clients, summarize
+from benchmark_isolation import RAISE, seed, total_salary
+from connection_pool import create_pool
+from retry import RETRYABLE_ERRORS, TransactionRunner
+
+
+class VersionConflict(Exception):
+    pass
+
+
+class PessimisticStrategy:
+    name = "for-update"
+    isolation_level = ISOLATION_LEVELS["read committed"]
+    retryable = RETRYABLE_ERRORS
+
+    def transaction(self, conn, id_employee):
+        with conn.cursor() as cur:
+            cur.execute("SELECT salary FROM employee WHERE id = %s FOR UPDATE", (id_employee,))
+            salary, = cur.fetchone()
+            cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (salary + RAISE, id_employee))
+
+
+class OptimisticStrategy:
+    name = "version-cas"
+    isolation_level = ISOLATION_LEVELS["read committed"]
+    retryable = (VersionConflict,)
+
+    def transaction(self, conn, id_employee):
+        with conn.cursor() as cur:
+            cur.execute("SELECT salary, version FROM employee WHERE id = %s", (id_employee,))
+            salary, version = cur.fetchone()
+            cur.execute("UPDATE employee SET salary=%s, version=version+1 WHERE id=%s AND version=%s", (salary + RAISE, id_employee, version))
+            if cur.rowcount == 0:
+                raise VersionConflict(f"employee {id_employee} changed after version {version}")
+
+
+class SerializableStrategy:
+    name = "serializable"
+    isolation_level = ISOLATION_LEVELS["serializable"]
+    retryable = RETRYABLE_ERRORS
+
+    def transaction(self, conn, id_employee):
+        with conn.cursor() as cur:
+            cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+            salary, = cur.fetchone()
+            cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (salary + RAISE, id_employee))
+
+
+STRATEGIES = {strategy.name: strategy for strategy in (PessimisticStrategy, OptimisticStrategy, SerializableStrategy)}
+
+
+def add_version_column(conn):
+    conn.execute("ALTER TABLE employee ADD COLUMN IF NOT EXISTS version integer NOT NULL DEFAULT 0")
+    conn.commit()
+
+
+def run_benchmark(conninfo, strategies, clients, duration, rows, max_attempts=100, base_delay=0.0005, max_delay=0.05):
+    results = []
+    with create_pool(conninfo, min_size=1, max_size=max(clients)) as pool:
+        with pool.connection() as conn:
+            add_version_column(conn)
+        for name in strategies:
+            strategy = STRATEGIES[name]()
+            for client_count in clients:
+                with pool.connection() as conn:
+                    seed(conn, rows, [4000])
+                    initial_total = total_salary(conn)
+                runner = TransactionRunner(max_attempts, base_delay, max_delay, retryable=strategy.retryable)
+                transaction = lambda conn, client: strategy.transaction(conn, random.randint(1, rows))
+                run = run_clients(pool, client_count, duration, transaction, strategy.isolation_level, runner, retryable=strategy.retryable)
+                with pool.connection() as conn:
+                    applied = int((total_salary(conn) - initial_total) / RAISE)
+                results.append({
+                    "strategy": name,
+                    **summarize(run),
+                    "p999_ms": percentile(run["latencies"], 0.999) * 1000,
+                    "retries_per_commit": runner.stats.retries_per_commit,
+                    "gave_up": runner.stats.failures,
+                    "lost": run["commits"] - applied,
+                })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Salary raises on a few hot employee rows: SELECT FOR UPDATE vs version compare-and-swap vs SERIALIZABLE with retry")
+    parser.add_argument("--strategy", nargs="+", choices=list(STRATEGIES), default=list(STRATEGIES))
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 4, 16, 64, 256])
+    parser.add_argument("--duration", type=float, default=5, help="seconds per measurement")
+    parser.add_argument("--rows", type=int, default=4, help="hot rows the clients pick from")
+    parser.add_argument("--max-attempts", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        with psycopg.connect(conninfo) as conn:
+            max_connections = int(conn.execute("SHOW max_connections").fetchone()[0])
+        if max(args.clients) >= max_connections:
+            parser.error(f"{max(args.clients)} clients need more than the server's max_connections={max_connections}")
+        results = run_benchmark(conninfo, args.strategy, args.clients, args.duration, args.rows, args.max_attempts)
+    print_table(results, ["strategy", "clients", "tps", "p50_ms", "p99_ms", "p999_ms", "retries_per_commit", "gave_up", "lost"])
+
+
+if __name__ == "__main__":
+    main()
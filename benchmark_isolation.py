@@ -0,0 +1,115 @@
+import argparse
+import random
+
+from benchmark import ISOLATION_LEVELS, benchmark_database, print_table, run_clients, summarize
+from connection_pool import create_pool
+
+RAISE = 100
+
+
+def seed(conn, rows, salaries):
+    with conn.cursor() as cur:
+        cur.execute("TRUNCATE employee RESTART IDENTITY")
+        cur.executemany("INSERT INTO employee (name, salary) VALUES (%s, %s)", [(f"Employee {number}", salaries[number % len(salaries)]) for number in range(rows)])
+    conn.commit()
+
+
+def total_salary(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT SUM(salary) FROM employee")
+        total, = cur.fetchone()
+    conn.commit()
+    return total
+
+
+class LostUpdateWorkload:
+    name = "lost-update"
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def setup(self, conn):
+        seed(conn, self.rows, [4000])
+        self.initial_total = total_salary(conn)
+
+    def transaction(self, conn, client):
+        id_employee = random.randint(1, self.rows)
+        with conn.cursor() as cur:
+            cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+            salary, = cur.fetchone()
+            cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (salary + 1, id_employee))
+
+    async def async_transaction(self, conn, client):
+        id_employee = random.randint(1, self.rows)
+        async with conn.cursor() as cur:
+            await cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+            salary, = await cur.fetchone()
+            await cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (salary + 1, id_employee))
+
+    def anomalies(self, conn, run):
+        return run["commits"] - int(total_salary(conn) - self.initial_total)
+
+
+class WriteSkewWorkload:
+    name = "write-skew"
+    salaries = [5000, 9000]
+
+    def __init__(self, rows):
+        self.groups = max(rows // 2, 1)
+        self.budget = sum(self.salaries) + RAISE
+
+    def setup(self, conn):
+        seed(conn, self.groups * 2, self.salaries)
+
+    def transaction(self, conn, client):
+        group = random.randrange(self.groups)
+        id_employee1, id_employee2 = group * 2 + 1, group * 2 + 2
+        with conn.cursor() as cur:
+            cur.execute("SELECT SUM(salary) FROM employee WHERE id IN (%s, %s)", (id_employee1, id_employee2))
+            total_salary, = cur.fetchone()
+            increment_salary = RAISE if total_salary + RAISE <= self.budget else 0
+            cur.execute("UPDATE employee SET salary=salary+%s WHERE id=%s", (increment_salary, random.choice((id_employee1, id_employee2))))
+
+    def anomalies(self, conn, run):
+        with conn.cursor() as cur:
+            cur.execute("SELECT COALESCE(SUM(GREATEST(total - %s, 0)), 0) FROM (SELECT SUM(salary) AS total FROM employee GROUP BY (id - 1) / 2) AS pairs", (self.budget,))
+            overshoot, = cur.fetchone()
+        conn.commit()
+        return int(overshoot // RAISE)
+
+
+WORKLOADS = {workload.name: workload for workload in (LostUpdateWorkload, WriteSkewWorkload)}
+
+
+def run_benchmark(conninfo, workloads, isolation_levels, clients, duration, rows):
+    results = []
+    with create_pool(conninfo, min_size=1, max_size=max(clients)) as pool:
+        for name in workloads:
+            workload = WORKLOADS[name](rows)
+            for isolation_level in isolation_levels:
+                for client_count in clients:
+                    with pool.connection() as conn:
+                        workload.setup(conn)
+                    run = run_clients(pool, client_count, duration, workload.transaction, ISOLATION_LEVELS[isolation_level])
+                    with pool.connection() as conn:
+                        anomalies = workload.anomalies(conn, run)
+                    results.append({"workload": name, "isolation": isolation_level, **summarize(run), "anomalies": anomalies})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Throughput, latency, aborts and anomalies per isolation level on the employee table")
+    parser.add_argument("--workload", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS))
+    parser.add_argument("--isolation", nargs="+", choices=list(ISOLATION_LEVELS), default=list(ISOLATION_LEVELS))
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--duration", type=float, default=5, help="seconds per measurement")
+    parser.add_argument("--rows", type=int, default=2, help="rows the clients contend on")
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        results = run_benchmark(conninfo, args.workload, args.isolation, args.clients, args.duration, args.rows)
+    print_table(results, ["workload", "isolation", "clients", "tps", "p50_ms", "p99_ms", "abort_rate", "anomalies"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+from contextlib import closing
+from threading import Lock, Thread
+import argparse
+import random
+import socket
+import time
+
+import psycopg
+from psycopg.conninfo import conninfo_to_dict, make_conninfo
+
+from benchmark import benchmark_database, print_table, run_clients, summarize
+from benchmark_isolation import RAISE, LostUpdateWorkload, seed
+from connection_pool import create_pool
+from retry import TransactionRunner
+
+MODES = {
+    "default": {"prepare_threshold": 5, "pipeline": False},
+    "unprepared": {"prepare_threshold": None, "pipeline": False},
+    "prepared": {"prepare_threshold": 0, "pipeline": False},
+    "pipeline": {"prepare_threshold": 5, "pipeline": True},
+    "pipeline-prepared": {"prepare_threshold": 0, "pipeline": True},
+}
+
+
+class RoundTripProxy:
+
+    def __init__(self, conninfo, rtt=0.0):
+        params = conninfo_to_dict(conninfo)
+        self.target = (params.get("host") or "localhost", int(params.get("port") or 5432))
+        self.rtt = rtt
+        self.round_trips = 0
+        self.lock = Lock()
+        self.listener = socket.create_server(("127.0.0.1", 0))
+        self.conninfo = make_conninfo(conninfo, host="127.0.0.1", port=self.listener.getsockname()[1], sslmode="disable")
+        Thread(target=self.accept, daemon=True).start()
+
+    def accept(self):
+        while True:
+            try:
+                client, _ = self.listener.accept()
+            except OSError:
+                return
+            server = socket.create_connection(self.target)
+            for sock in (client, server):
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            turn = ["server"]
+            Thread(target=self.forward, args=(client, server, turn, "client"), daemon=True).start()
+            Thread(target=self.forward, args=(server, client, turn, "server"), daemon=True).start()
+
+    def forward(self, source, target, turn, side):
+        try:
+            while True:
+                data = source.recv(65536)
+                if not data:
+                    break
+                if side == "server" and self.rtt:
+                    time.sleep(self.rtt)
+                with self.lock:
+                    # a round trip is every time the client speaks again after the server answered
+                    if side == "client" and turn[0] == "server":
+                        self.round_trips += 1
+                    turn[0] = side
+                target.sendall(data)
+        except OSError:
+            pass
+        finally:
+            source.close()
+            target.close()
+
+    def close(self):
+        self.listener.close()
+
+
+def transfer(rows):
+    def transaction(conn, client):
+        first, second = sorted(random.sample(range(1, rows + 1), 2))
+        amount = random.choice((RAISE, -RAISE))
+        with conn.cursor() as cur:
+            cur.execute("UPDATE employee SET salary = salary - %s WHERE id = %s", (amount, first))
+            cur.execute("UPDATE employee SET salary = salary + %s WHERE id = %s", (amount, second))
+    return transaction
+
+
+TRANSACTIONS = {
+    "read-modify-write": lambda rows: LostUpdateWorkload(rows).transaction,
+    "transfer": transfer,
+}
+
+
+def count_round_trips(proxy, transaction, mode, repeats):
+    runner = TransactionRunner(pipeline=MODES[mode]["pipeline"])
+    with psycopg.connect(proxy.conninfo, prepare_threshold=MODES[mode]["prepare_threshold"]) as conn:
+        for _ in range(repeats):
+            runner.run(conn, transaction, 0)
+        before = proxy.round_trips
+        for _ in range(repeats):
+            runner.run(conn, transaction, 0)
+        return (proxy.round_trips - before) / repeats
+
+
+def run_benchmark(conninfo, transactions, modes, clients, duration, rows, rtt=0.0, repeats=20):
+    results = []
+    with psycopg.connect(conninfo) as conn:
+        seed(conn, rows, [3000])
+    with closing(RoundTripProxy(conninfo, rtt)) as proxy:
+        for name in transactions:
+            transaction = TRANSACTIONS[name](rows)
+            for mode in modes:
+                round_trips = count_round_trips(proxy, transaction, mode, repeats)
+                runner = TransactionRunner(pipeline=MODES[mode]["pipeline"])
+                for client_count in clients:
+                    with create_pool(proxy.conninfo, min_size=1, max_size=client_count, kwargs={"prepare_threshold": MODES[mode]["prepare_threshold"]}) as pool:
+                        run = run_clients(pool, client_count, duration, transaction, runner=runner)
+                    results.append({"transaction": name, "mode": mode, "round_trips": round_trips, **summarize(run)})
+    return results
+
+
+def savings(results, baseline="default"):
+    baselines = {(result["transaction"], result["clients"]): result for result in results if result["mode"] == baseline}
+    for result in results:
+        reference = baselines.get((result["transaction"], result["clients"]))
+        if reference is not None:
+            result["round_trips_saved"] = reference["round_trips"] - result["round_trips"]
+            result["p50_saved_ms"] = reference["p50_ms"] - result["p50_ms"]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Round trips and latency per transaction with psycopg pipeline mode and server-side prepared statements")
+    parser.add_argument("--transaction", nargs="+", choices=list(TRANSACTIONS), default=list(TRANSACTIONS))
+    parser.add_argument("--mode", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--duration", type=float, default=5, help="seconds per measurement")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--rtt", type=float, default=0.0005, help="seconds of network round trip added by the proxy")
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        results = savings(run_benchmark(conninfo, args.transaction, args.mode, args.clients, args.duration, args.rows, args.rtt))
+    print_table(results, ["transaction", "mode", "clients", "round_trips", "round_trips_saved", "tps", "p50_ms", "p99_ms", "p50_saved_ms", "abort_rate"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import argparse
+import itertools
+
+import psycopg
+from psycopg import sql
+from psycopg.conninfo import conninfo_to_dict
+
+from benchmark import benchmark_database, print_table
+from bulk_load import generate_employees, load_copy
+from crash_recovery import crash_and_recover, wal_since_checkpoint
+from postgres_session import session
+
+SETTINGS = ["max_wal_size", "checkpoint_timeout"]
+
+
+def configure(conninfo, **settings):
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        for name, value in settings.items():
+            if value is None:
+                conn.execute(sql.SQL("ALTER SYSTEM RESET {}").format(sql.Identifier(name)))
+            else:
+                conn.execute(sql.SQL("ALTER SYSTEM SET {} = {}").format(sql.Identifier(name), sql.Literal(str(value))))
+        conn.execute("SELECT pg_reload_conf()")
+
+
+def batch_ranges(rows, batch_size):
+    batches = max(-(-rows // batch_size), 1)
+    for batch in itertools.count():
+        first = batch % batches * batch_size + 1
+        yield first, first + batch_size - 1
+
+
+def generate_wal(conn, target_bytes, batch_size=10000):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_current_wal_lsn()")
+        start_lsn, = cur.fetchone()
+        cur.execute("SELECT max(id) FROM employee")
+        rows, = cur.fetchone()
+        conn.commit()
+        ranges = batch_ranges(rows, batch_size)
+        increments = 0
+        written = 0
+        while written < target_bytes:
+            cur.execute("UPDATE employee SET salary = salary + 1 WHERE id BETWEEN %s AND %s", next(ranges))
+            increments += cur.rowcount
+            conn.commit()
+            cur.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)::bigint", (start_lsn,))
+            written, = cur.fetchone()
+            conn.commit()
+    return increments
+
+
+def total_salary(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT SUM(salary) FROM employee")
+        total, = cur.fetchone()
+    conn.commit()
+    return total
+
+
+def run_benchmark(server, connection_uri, max_wal_sizes, checkpoint_timeouts, wal_megabytes, rows):
+    results = []
+    with psycopg.connect(connection_uri()) as conn:
+        load_copy(conn, generate_employees(rows))
+    try:
+        for max_wal_size in max_wal_sizes:
+            for checkpoint_timeout in checkpoint_timeouts:
+                configure(connection_uri(), max_wal_size=max_wal_size, checkpoint_timeout=checkpoint_timeout)
+                for megabytes in wal_megabytes:
+                    conn = psycopg.connect(connection_uri())
+                    conn.execute("CHECKPOINT")
+                    expected_total = total_salary(conn)
+                    expected_total += generate_wal(conn, megabytes * 1024 * 1024)
+                    replay_bytes = wal_since_checkpoint(conn)
+                    conn.close()
+
+                    recovery = crash_and_recover(server, connection_uri)
+                    with psycopg.connect(connection_uri()) as conn:
+                        lost = expected_total - total_salary(conn)
+                    results.append({
+                        "max_wal_size": max_wal_size,
+                        "checkpoint_timeout": checkpoint_timeout,
+                        "wal_mb": megabytes,
+                        "replay_mb": replay_bytes / 1024 / 1024,
+                        **recovery,
+                        "lost": lost,
+                    })
+    finally:
+        configure(connection_uri(), **{name: None for name in SETTINGS})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crash the server with SIGKILL after writing WAL and measure how long recovery takes")
+    parser.add_argument("--max-wal-size", nargs="+", default=["64MB", "1GB"])
+    parser.add_argument("--checkpoint-timeout", nargs="+", default=["5min"])
+    parser.add_argument("--wal-mb", nargs="+", type=int, default=[16, 64, 256])
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    server = session.start().crash_server()
+    if server is None:
+        parser.error("crashing the server needs the Postgres container owned by this session")
+    durable = session.durable_session()
+    with benchmark_database(durable) as conninfo:
+        database = conninfo_to_dict(conninfo)["dbname"]
+        results = run_benchmark(server, lambda: durable.connection_uri(database), args.max_wal_size, args.checkpoint_timeout, args.wal_mb, args.rows)
+    print_table(results, ["max_wal_size", "checkpoint_timeout", "wal_mb", "replay_mb", "redo_seconds", "ready_seconds", "lost"])
+
+
+if __name__ == "__main__":
+    main()
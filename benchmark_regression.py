@@ -0,0 +1,226 @@
+from contextlib import ExitStack
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+import psycopg
+from psycopg import IsolationLevel
+
+from benchmark import ISOLATION_LEVELS, benchmark_database, print_table, run_clients, summarize
+from benchmark_hot_row import PessimisticStrategy, add_version_column
+from benchmark_isolation import LostUpdateWorkload, seed
+from connection_pool import create_pool
+from isolation_scenarios import lost_update, write_skew
+from postgres_session import session
+from scenarios import explore
+
+THRESHOLD = 0.05
+CONFIDENCE = 0.95
+RESAMPLES = 2000
+
+
+class Case:
+
+    def __init__(self, name, unit, higher_is_better, measure):
+        self.name = name
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+        self.measure = measure
+
+
+def time_operations(conninfo, operation, operations):
+    with psycopg.connect(conninfo) as conn:
+        seed(conn, 0, [0])
+        started = time.perf_counter()
+        for number in range(operations):
+            operation(conn, number)
+        return (time.perf_counter() - started) / operations * 1000
+
+
+def atomicity(conn, number):
+    conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", (f"Employee {number}", 2500))
+    conn.commit()
+    conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", (f"Rolled back {number}", 3500))
+    conn.rollback()
+
+
+def consistency(conn, number):
+    try:
+        conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", (f"Employee {number}", "not a salary"))
+    except psycopg.errors.InvalidTextRepresentation:
+        conn.rollback()
+
+
+def scenario_seconds(conninfo, scenario):
+    return explore(conninfo, scenario, workers=4).seconds
+
+
+def workload_tps(conninfo, isolation_level, clients, duration):
+    workload = LostUpdateWorkload(rows=16)
+    with create_pool(conninfo, min_size=clients, max_size=clients) as pool:
+        with pool.connection() as conn:
+            workload.setup(conn)
+        return summarize(run_clients(pool, clients, duration, workload.transaction, ISOLATION_LEVELS[isolation_level]))["tps"]
+
+
+def hot_row_tps(conninfo, clients, duration):
+    strategy = PessimisticStrategy()
+    with create_pool(conninfo, min_size=clients, max_size=clients) as pool:
+        with pool.connection() as conn:
+            add_version_column(conn)
+            seed(conn, 4, [4000])
+        transaction = lambda conn, client: strategy.transaction(conn, random.randint(1, 4))
+        return summarize(run_clients(pool, clients, duration, transaction, strategy.isolation_level))["tps"]
+
+
+def cases(operations=200, duration=1.0, clients=8):
+    return {case.name: case for case in [
+        Case("atomicity", "ms/op", False, lambda conninfo: time_operations(conninfo, atomicity, operations)),
+        Case("consistency", "ms/op", False, lambda conninfo: time_operations(conninfo, consistency, operations)),
+        Case("isolation lost-update", "s", False, lambda conninfo: scenario_seconds(conninfo, lost_update(IsolationLevel.REPEATABLE_READ))),
+        Case("isolation write-skew", "s", False, lambda conninfo: scenario_seconds(conninfo, write_skew(IsolationLevel.SERIALIZABLE))),
+        Case("read committed tps", "tps", True, lambda conninfo: workload_tps(conninfo, "read committed", clients, duration)),
+        Case("serializable tps", "tps", True, lambda conninfo: workload_tps(conninfo, "serializable", clients, duration)),
+        Case("hot-row for-update tps", "tps", True, lambda conninfo: hot_row_tps(conninfo, clients, duration)),
+    ]}
+
+
+def run_cases(databases, selected, warmup=1, samples=5):
+    samples_by_case = {case.name: [] for case in selected}
+    for _ in range(warmup):
+        for case in selected:
+            case.measure(databases[case.name])
+    for _ in range(samples):
+        for case in selected:
+            samples_by_case[case.name].append(case.measure(databases[case.name]))
+    return {case.name: {"unit": case.unit, "higher_is_better": case.higher_is_better, "samples": samples_by_case[case.name]} for case in selected}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment(conninfo):
+    with psycopg.connect(conninfo) as conn:
+        server_version, = conn.execute("SHOW server_version").fetchone()
+    return {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "server_version": server_version,
+        "profile": session.profile,
+    }
+
+
+def slowdown(baseline, current, higher_is_better):
+    if higher_is_better:
+        return baseline / current - 1 if current else float("inf")
+    return current / baseline - 1 if baseline else float("inf")
+
+
+def bootstrap_interval(baseline, current, higher_is_better, confidence=CONFIDENCE, resamples=RESAMPLES, seed=0):
+    rng = random.Random(seed)
+    estimates = sorted(
+        slowdown(statistics.fmean(rng.choices(baseline, k=len(baseline))), statistics.fmean(rng.choices(current, k=len(current))), higher_is_better)
+        for _ in range(resamples)
+    )
+    tail = (1 - confidence) / 2
+    return estimates[int(tail * (resamples - 1))], estimates[int((1 - tail) * (resamples - 1))]
+
+
+def compare(baseline, current, threshold=THRESHOLD, confidence=CONFIDENCE):
+    rows = []
+    for name, result in current["cases"].items():
+        row = {"case": name, "unit": result["unit"], "current": statistics.fmean(result["samples"])}
+        if name not in baseline["cases"]:
+            rows.append({**row, "verdict": "new"})
+            continue
+        before = baseline["cases"][name]["samples"]
+        low, high = bootstrap_interval(before, result["samples"], result["higher_is_better"], confidence)
+        if low > threshold:
+            verdict = "slower"
+        elif high < -threshold:
+            verdict = "faster"
+        else:
+            verdict = "same"
+        rows.append({
+            **row,
+            "baseline": statistics.fmean(before),
+            "change_pct": slowdown(statistics.fmean(before), row["current"], result["higher_is_better"]) * 100,
+            "ci_low_pct": low * 100,
+            "ci_high_pct": high * 100,
+            "verdict": verdict,
+        })
+    return rows
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
+
+
+def save(path, results):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def main(argv=None):
+    available = cases()
+    parser = argparse.ArgumentParser(description="Sample the ACID, isolation and throughput benchmarks and compare them against a stored baseline")
+    parser.add_argument("--case", nargs="+", choices=list(available), default=list(available))
+    parser.add_argument("--warmup", type=int, default=1, help="discarded rounds before sampling")
+    parser.add_argument("--samples", type=int, default=5, help="measured rounds per case")
+    parser.add_argument("--operations", type=int, default=200, help="operations per ACID sample")
+    parser.add_argument("--duration", type=float, default=1.0, help="seconds per throughput sample")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--output", help="write the samples to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--results", help="compare this JSON file instead of running the benchmarks")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="slowdown the confidence interval must exceed to fail")
+    parser.add_argument("--confidence", type=float, default=CONFIDENCE)
+    args = parser.parse_args(argv)
+
+    if args.results:
+        results = load(args.results)
+    else:
+        selected = [cases(args.operations, args.duration, args.clients)[name] for name in args.case]
+        with ExitStack() as stack:
+            databases = {case.name: stack.enter_context(benchmark_database()) for case in selected}
+            results = {
+                "environment": environment(databases[selected[0].name]),
+                "settings": {"warmup": args.warmup, "samples": args.samples, "operations": args.operations, "duration": args.duration, "clients": args.clients},
+                "cases": run_cases(databases, selected, args.warmup, args.samples),
+            }
+    if args.output:
+        save(args.output, results)
+
+    if not args.baseline or not os.path.exists(args.baseline):
+        if args.baseline:
+            print(f"no baseline at {args.baseline}, nothing to compare", file=sys.stderr)
+        print_table([{"case": name, "unit": result["unit"], "mean": statistics.fmean(result["samples"]), "stdev": statistics.stdev(result["samples"]) if len(result["samples"]) > 1 else 0.0} for name, result in results["cases"].items()], ["case", "unit", "mean", "stdev"])
+        return 0
+
+    rows = compare(load(args.baseline), results, args.threshold, args.confidence)
+    print_table(rows, ["case", "unit", "baseline", "current", "change_pct", "ci_low_pct", "ci_high_pct", "verdict"])
+    slower = [row["case"] for row in rows if row["verdict"] == "slower"]
+    if slower:
+        print(f"significant slowdown (> {args.threshold:.0%} at {args.confidence:.0%} confidence): {', '.join(slower)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import argparse
+
+from benchmark import ISOLATION_LEVELS, benchmark_database, print_table, run_clients, summarize
+from benchmark_isolation import LostUpdateWorkload
+from connection_pool import create_pool
+from retry import RetryBudget, TransactionRunner
+
+
+def run_benchmark(conninfo, isolation_levels, clients, duration, max_attempts, base_delay, max_delay, budget_ratio=None):
+    workload = LostUpdateWorkload(rows=1)
+    results = []
+    with create_pool(conninfo, min_size=1, max_size=max(clients)) as pool:
+        for isolation_level in isolation_levels:
+            for client_count in clients:
+                with pool.connection() as conn:
+                    workload.setup(conn)
+                budget = RetryBudget(budget_ratio) if budget_ratio is not None else None
+                runner = TransactionRunner(max_attempts, base_delay, max_delay, budget)
+                run = run_clients(pool, client_count, duration, workload.transaction, ISOLATION_LEVELS[isolation_level], runner)
+                with pool.connection() as conn:
+                    anomalies = workload.anomalies(conn, run)
+                summary = summarize(run)
+                stats = runner.stats
+                results.append({
+                    "isolation": isolation_level,
+                    **summary,
+                    "goodput": summary["tps"],
+                    "retries_per_commit": stats.retries_per_commit,
+                    "wasted_pct": 100 * stats.wasted_seconds / (run["seconds"] * client_count),
+                    "gave_up": stats.failures,
+                    "anomalies": anomalies,
+                })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Goodput of retried read-modify-write transactions on one hot employee row")
+    parser.add_argument("--isolation", nargs="+", choices=list(ISOLATION_LEVELS), default=list(ISOLATION_LEVELS))
+    parser.add_argument("--clients", nargs="+", type=int, default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=5, help="seconds per measurement")
+    parser.add_argument("--max-attempts", type=int, default=10)
+    parser.add_argument("--base-delay", type=float, default=0.001, help="first backoff ceiling in seconds")
+    parser.add_argument("--max-delay", type=float, default=0.1, help="largest backoff ceiling in seconds")
+    parser.add_argument("--budget-ratio", type=float, help="retries allowed per transaction across all clients")
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        results = run_benchmark(conninfo, args.isolation, args.clients, args.duration, args.max_attempts, args.base_delay, args.max_delay, args.budget_ratio)
+    print_table(results, ["isolation", "clients", "goodput", "p50_ms", "p99_ms", "retries_per_commit", "wasted_pct", "gave_up", "anomalies"])
+
+
+if __name__ == "__main__":
+    main()
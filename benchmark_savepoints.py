@@ -0,0 +1,123 @@
+from threading import Event, Thread
+import argparse
+import random
+import statistics
+import time
+
+import psycopg
+
+from benchmark import benchmark_database, print_table, run_clients, summarize
+from benchmark_isolation import seed
+from connection_pool import create_pool
+
+SUBXACT_CACHE = 64
+
+
+def insert_in_savepoints(conn, subtransactions, rows):
+    conn.execute("SELECT pg_current_xact_id()")
+    if not subtransactions:
+        conn.execute("INSERT INTO employee (name, salary) SELECT 'Employee ' || n, 3000 FROM generate_series(1, %s) n", (rows,))
+        return
+    per_savepoint = max(rows // subtransactions, 1)
+    for number in range(subtransactions):
+        with conn.transaction():
+            conn.execute("INSERT INTO employee (name, salary) SELECT 'Savepoint ' || %s, 3000 FROM generate_series(1, %s)", (number, per_savepoint))
+
+
+def subxact_state(conn):
+    cur = conn.execute(
+        "SELECT s.subxact_count, s.subxact_overflowed FROM pg_stat_get_backend_idset() AS b(id), pg_stat_get_backend_subxact(b.id) AS s "
+        "WHERE pg_stat_get_backend_pid(b.id) = pg_backend_pid()"
+    )
+    return cur.fetchone()
+
+
+def commit_latency(conninfo, subtransactions, rows, repeats):
+    transaction_seconds = []
+    commit_seconds = []
+    with psycopg.connect(conninfo) as conn:
+        for _ in range(repeats):
+            started = time.perf_counter()
+            insert_in_savepoints(conn, subtransactions, rows)
+            committing = time.perf_counter()
+            conn.commit()
+            commit_seconds.append(time.perf_counter() - committing)
+            transaction_seconds.append(time.perf_counter() - started)
+    return statistics.median(transaction_seconds), statistics.median(commit_seconds)
+
+
+def count_employees(conn, client):
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*) FROM employee")
+        count, = cur.fetchone()
+    return count
+
+
+def update_employees(conninfo, base_rows, stop, commits, number):
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        while not stop.is_set():
+            conn.execute("UPDATE employee SET salary = salary + 1 WHERE id = %s", (random.randint(1, base_rows),))
+            commits[number] += 1
+
+
+def reader_throughput(conninfo, pool, subtransactions, rows, readers, writers, duration, base_rows):
+    stop = Event()
+    commits = [0] * writers
+    with psycopg.connect(conninfo) as holder:
+        insert_in_savepoints(holder, subtransactions, rows)
+        count, overflowed = subxact_state(holder)
+        threads = [Thread(target=update_employees, args=(conninfo, base_rows, stop, commits, number)) for number in range(writers)]
+        for thread in threads:
+            thread.start()
+        try:
+            run = run_clients(pool, readers, duration, count_employees)
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        holder.rollback()
+    return run, count, overflowed, sum(commits) / run["seconds"]
+
+
+def run_benchmark(conninfo, subtransaction_counts, rows, readers, writers, duration, repeats=5, base_rows=10000):
+    results = []
+    with create_pool(conninfo, min_size=readers, max_size=readers) as pool:
+        for subtransactions in subtransaction_counts:
+            with pool.connection() as conn:
+                seed(conn, base_rows, [3000])
+            transaction_seconds, commit_seconds = commit_latency(conninfo, subtransactions, rows, repeats)
+            with pool.connection() as conn:
+                seed(conn, base_rows, [3000])
+            run, count, overflowed, writer_tps = reader_throughput(conninfo, pool, subtransactions, rows, readers, writers, duration, base_rows)
+            summary = summarize(run)
+            results.append({
+                "subxacts": subtransactions,
+                "cached": count,
+                "overflowed": overflowed,
+                "transaction_ms": transaction_seconds * 1000,
+                "commit_ms": commit_seconds * 1000,
+                "reader_tps": summary["tps"],
+                "reader_p50_ms": summary["p50_ms"],
+                "reader_p99_ms": summary["p99_ms"],
+                "writer_tps": writer_tps,
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=f"Commit latency and concurrent reader throughput as one transaction's savepoints cross the {SUBXACT_CACHE}-entry subtransaction cache")
+    parser.add_argument("--subtransactions", nargs="+", type=int, default=[0, 16, 32, 63, 64, 65, 128, 512])
+    parser.add_argument("--rows", type=int, default=5000, help="rows the savepoint transaction inserts, spread across its savepoints")
+    parser.add_argument("--readers", type=int, default=8, help="clients scanning employee while the savepoint transaction is open")
+    parser.add_argument("--writers", type=int, default=2, help="clients committing single-row updates meanwhile, so readers meet xids newer than the open transaction")
+    parser.add_argument("--duration", type=float, default=3, help="seconds of reads per measurement")
+    parser.add_argument("--repeats", type=int, default=5, help="committed transactions timed per subtransaction count")
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        results = run_benchmark(conninfo, args.subtransactions, args.rows, args.readers, args.writers, args.duration, args.repeats)
+    print_table(results, ["subxacts", "cached", "overflowed", "transaction_ms", "commit_ms", "reader_tps", "reader_p50_ms", "reader_p99_ms", "writer_tps"])
+
+
+if __name__ == "__main__":
+    main()
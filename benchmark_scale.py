@@ -0,0 +1,168 @@
+import argparse
+import random
+import time
+
+import psycopg
+from psycopg import IsolationLevel
+
+from benchmark import benchmark_database, percentile, print_table, run_clients, summarize
+from bulk_load import generate_employees, load_copy, scale_rows
+from connection_pool import create_pool
+from postgres_session import SCHEMA
+
+INDEXES = {
+    "primary-key": [],
+    "name": ["CREATE INDEX employee_name ON employee (name)"],
+    "covering": ["CREATE INDEX employee_name_salary ON employee (name) INCLUDE (id, salary)"],
+}
+QUERIES = {
+    "salary-by-id": "SELECT salary FROM employee WHERE id = %(id)s",
+    "salary-by-name": "SELECT id, salary FROM employee WHERE name = %(name)s",
+    "raise-by-name": "UPDATE employee SET salary = salary + 100 WHERE name = %(name)s",
+    "pair-total": "SELECT SUM(salary) FROM employee WHERE id IN (%(id)s, %(other)s)",
+    "total-salary": "SELECT SUM(salary) FROM employee",
+}
+LOCK_TYPES = ["relation", "page", "tuple"]
+
+
+def create_layout(conn, partitions):
+    conn.execute("DROP TABLE employee")
+    if partitions:
+        conn.execute("CREATE TABLE employee (id serial, name text, salary double precision, PRIMARY KEY (id)) PARTITION BY HASH (id)")
+        for remainder in range(partitions):
+            conn.execute(f"CREATE TABLE employee_{remainder} PARTITION OF employee FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder})")
+    else:
+        for statement in SCHEMA:
+            conn.execute(statement)
+    conn.commit()
+
+
+def load(conninfo, rows, partitions, index):
+    with psycopg.connect(conninfo) as conn:
+        create_layout(conn, partitions)
+        started = time.perf_counter()
+        load_copy(conn, generate_employees(rows))
+        conn.commit()
+        seconds = time.perf_counter() - started
+        for statement in INDEXES[index]:
+            conn.execute(statement)
+        conn.commit()
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute("VACUUM ANALYZE employee")
+    return seconds
+
+
+def sample_employees(conn, rows, count):
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, name FROM employee WHERE id = ANY(%s) ORDER BY id", (random.sample(range(1, rows + 1), min(count, rows)),))
+        employees = cur.fetchall()
+    conn.commit()
+    return employees
+
+
+def parameters(employees):
+    (id_employee, name), (other, _) = random.sample(employees, 2)
+    return {"id": id_employee, "other": other, "name": name}
+
+
+def plan_shape(node, shape=None):
+    shape = [] if shape is None else shape
+    if not shape or shape[-1] != node["Node Type"]:
+        shape.append(node["Node Type"])
+    for child in node.get("Plans", []):
+        plan_shape(child, shape)
+    return shape
+
+
+def explain(conn, query, params):
+    with conn.transaction(force_rollback=True):
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+            (plan,), = cur.fetchone()
+    return {
+        "plan": " > ".join(plan_shape(plan["Plan"])),
+        "explain_ms": plan["Execution Time"],
+        "shared_hit": plan["Plan"]["Shared Hit Blocks"],
+        "shared_read": plan["Plan"]["Shared Read Blocks"],
+    }
+
+
+def latency(conn, query, employees, repeats):
+    latencies = []
+    for _ in range(repeats):
+        params = parameters(employees)
+        started = time.perf_counter()
+        with conn.transaction(force_rollback=True):
+            conn.execute(query, params)
+        latencies.append(time.perf_counter() - started)
+    return {"p50_ms": percentile(latencies, 0.50) * 1000, "p99_ms": percentile(latencies, 0.99) * 1000}
+
+
+def predicate_locks(conn, query, params):
+    conn.isolation_level = IsolationLevel.SERIALIZABLE
+    try:
+        with conn.transaction(force_rollback=True):
+            with conn.cursor() as cur:
+                cur.execute(query, params)
+                cur.execute("SELECT locktype, count(*) FROM pg_locks WHERE mode = 'SIReadLock' AND pid = pg_backend_pid() GROUP BY locktype")
+                counts = dict(cur.fetchall())
+    finally:
+        conn.isolation_level = None
+    return {f"siread_{locktype}": counts.get(locktype, 0) for locktype in LOCK_TYPES}
+
+
+def disjoint_raise(employees, clients):
+    def transaction(conn, client):
+        id_employee, name = random.choice(employees[client::clients])
+        with conn.cursor() as cur:
+            cur.execute("SELECT salary FROM employee WHERE name = %s", (name,))
+            salary, = cur.fetchone()
+            cur.execute("UPDATE employee SET salary = %s WHERE id = %s", (salary + 1, id_employee))
+    return transaction
+
+
+def run_benchmark(conninfo, rows, indexes, partitions=0, queries=None, repeats=20, clients=(4,), duration=5, samples=1000):
+    plans, conflicts = [], []
+    for index in indexes:
+        # a fresh table per index: an index built over HOT chains left by the previous conflict run
+        # gets indcheckxmin and stays invisible to the planner while older snapshots are open
+        load_seconds = load(conninfo, rows, partitions, index)
+        layout = {"rows": rows, "partitions": partitions, "index": index}
+        with psycopg.connect(conninfo) as conn:
+            employees = sample_employees(conn, rows, samples)
+            for name in queries or QUERIES:
+                query = QUERIES[name]
+                params = parameters(employees)
+                plans.append({**layout, "query": name, **explain(conn, query, params), **latency(conn, query, employees, repeats), **predicate_locks(conn, query, params)})
+        # every client reads and updates its own rows, so each serialization failure is a false positive
+        for client_count in clients:
+            with create_pool(conninfo, min_size=1, max_size=client_count) as pool:
+                run = run_clients(pool, client_count, duration, disjoint_raise(employees, client_count), IsolationLevel.SERIALIZABLE)
+            conflicts.append({**layout, "load_s": load_seconds, **summarize(run), "false_positives": run["aborts"]})
+    return plans, conflicts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grow employee to millions of rows and compare plans, latency, predicate locks and SSI false positives per index and partition layout")
+    parser.add_argument("--rows", type=int, default=scale_rows(10000000))
+    parser.add_argument("--index", nargs="+", choices=list(INDEXES), default=list(INDEXES))
+    parser.add_argument("--partitions", nargs="+", type=int, default=[0], help="hash partitions by id; 0 keeps a plain table")
+    parser.add_argument("--query", nargs="+", choices=list(QUERIES), default=list(QUERIES))
+    parser.add_argument("--repeats", type=int, default=20, help="timed executions per query")
+    parser.add_argument("--clients", nargs="+", type=int, default=[4, 16])
+    parser.add_argument("--duration", type=float, default=5, help="seconds per SERIALIZABLE measurement")
+    args = parser.parse_args(argv)
+
+    plans, conflicts = [], []
+    for partitions in args.partitions:
+        with benchmark_database() as conninfo:
+            layout_plans, layout_conflicts = run_benchmark(conninfo, args.rows, args.index, partitions, args.query, args.repeats, args.clients, args.duration)
+            plans.extend(layout_plans)
+            conflicts.extend(layout_conflicts)
+    print_table(plans, ["partitions", "index", "query", "plan", "explain_ms", "shared_hit", "shared_read", "p50_ms", "p99_ms", *(f"siread_{locktype}" for locktype in LOCK_TYPES)])
+    print()
+    print_table(conflicts, ["partitions", "index", "load_s", "clients", "tps", "p50_ms", "abort_rate", "false_positives"])
+
+
+if __name__ == "__main__":
+    main()
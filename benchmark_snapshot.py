@@ -0,0 +1,156 @@
+from threading import Event, Thread
+import argparse
+import random
+import re
+import time
+
+import psycopg
+from psycopg import sql
+
+from benchmark import benchmark_database, print_table
+from benchmark_isolation import seed
+
+PHASES = ["baseline", "snapshot", "released"]
+TABLE_STATS = """
+SELECT n_tup_upd, n_tup_hot_upd, n_dead_tup, autovacuum_count,
+       pg_relation_size('employee'), pg_indexes_size('employee')
+FROM pg_stat_user_tables WHERE relname = 'employee'
+"""
+
+
+class VacuumReport:
+
+    def __init__(self):
+        self.removed = 0
+        self.not_removable = 0
+
+    def notice(self, diagnostic):
+        message = diagnostic.message_primary or ""
+        removed = re.search(r"tuples: (\d+) removed, \d+ remain, (\d+) are dead but not yet removable", message)
+        if removed and '.employee":' in message:
+            self.removed = int(removed.group(1))
+            self.not_removable = int(removed.group(2))
+
+
+def update_salaries(conninfo, rows, stop, counts, number):
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        while not stop.is_set():
+            conn.execute("UPDATE employee SET salary = salary + 1 WHERE id = %s", (random.randint(1, rows),))
+            counts[number] += 1
+
+
+def read_salaries(conninfo, rows, stop, counts, number):
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        while not stop.is_set():
+            conn.execute("SELECT salary FROM employee WHERE id = %s", (random.randint(1, rows),)).fetchone()
+            counts[number] += 1
+
+
+def table_stats(conn):
+    cur = conn.execute(TABLE_STATS)
+    updated, hot, dead, autovacuums, table_bytes, index_bytes = cur.fetchone()
+    return {"updated": updated, "hot": hot, "dead": dead, "autovacuums": autovacuums, "table_bytes": table_bytes, "index_bytes": index_bytes}
+
+
+def vacuum(conn):
+    report = VacuumReport()
+    conn.add_notice_handler(report.notice)
+    try:
+        conn.execute("VACUUM (VERBOSE) employee")
+    finally:
+        conn.remove_notice_handler(report.notice)
+    return report
+
+
+def run_benchmark(conninfo, rows, writers, readers, phase_seconds, interval, fillfactor=100, index_salary=False):
+    with psycopg.connect(conninfo) as conn:
+        conn.execute(sql.SQL("ALTER TABLE employee SET (fillfactor = {}, autovacuum_vacuum_scale_factor = 0, autovacuum_vacuum_threshold = 1000)").format(sql.Literal(fillfactor)))
+        if index_salary:
+            conn.execute("CREATE INDEX IF NOT EXISTS employee_salary ON employee (salary)")
+        seed(conn, rows, [3000])
+
+    stop = Event()
+    updates = [0] * writers
+    reads = [0] * readers
+    threads = [Thread(target=update_salaries, args=(conninfo, rows, stop, updates, number)) for number in range(writers)]
+    threads += [Thread(target=read_salaries, args=(conninfo, rows, stop, reads, number)) for number in range(readers)]
+    samples = []
+    with psycopg.connect(conninfo, autocommit=True) as monitor, psycopg.connect(conninfo) as holder:
+        monitor.execute("SET stats_fetch_consistency = none")
+        holder.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+        vacuum(monitor)
+        for thread in threads:
+            thread.start()
+        try:
+            started = time.perf_counter()
+            last = {"time": started, "updates": 0, "reads": 0, **table_stats(monitor)}
+            for phase in PHASES:
+                if phase == "snapshot":
+                    holder.execute("SELECT count(*) FROM employee").fetchone()
+                elif phase == "released":
+                    holder.commit()
+                phase_end = time.perf_counter() + phase_seconds
+                while time.perf_counter() < phase_end:
+                    time.sleep(interval)
+                    report = vacuum(monitor)
+                    now = {"time": time.perf_counter(), "updates": sum(updates), "reads": sum(reads), **table_stats(monitor)}
+                    seconds = now["time"] - last["time"]
+                    updated = now["updated"] - last["updated"]
+                    samples.append({
+                        "phase": phase,
+                        "elapsed": now["time"] - started,
+                        "update_tps": (now["updates"] - last["updates"]) / seconds,
+                        "read_tps": (now["reads"] - last["reads"]) / seconds,
+                        "table_kb": now["table_bytes"] / 1024,
+                        "index_kb": now["index_bytes"] / 1024,
+                        "dead_tuples": now["dead"],
+                        "hot_pct": 100 * (now["hot"] - last["hot"]) / updated if updated else 0.0,
+                        "vacuum_removed": report.removed,
+                        "not_removable": report.not_removable,
+                        "autovacuums": now["autovacuums"],
+                    })
+                    last = now
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+    return samples
+
+
+def summarize_phases(samples):
+    results = []
+    for phase in PHASES:
+        phase_samples = [sample for sample in samples if sample["phase"] == phase]
+        if not phase_samples:
+            continue
+        results.append({
+            "phase": phase,
+            "update_tps": sum(sample["update_tps"] for sample in phase_samples) / len(phase_samples),
+            "read_tps": sum(sample["read_tps"] for sample in phase_samples) / len(phase_samples),
+            "table_kb": phase_samples[-1]["table_kb"],
+            "index_kb": phase_samples[-1]["index_kb"],
+            "not_removable": max(sample["not_removable"] for sample in phase_samples),
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Hold a REPEATABLE READ snapshot open while clients update employee and watch bloat, HOT updates, vacuum and throughput over time")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--phase-seconds", type=float, default=20, help="seconds before, during and after the long snapshot")
+    parser.add_argument("--interval", type=float, default=2, help="seconds between samples; each sample runs VACUUM the way autovacuum would")
+    parser.add_argument("--fillfactor", type=int, default=100, help="lower values leave room on each page for HOT updates")
+    parser.add_argument("--index-salary", action="store_true", help="index salary so updates can no longer be HOT")
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        samples = run_benchmark(conninfo, args.rows, args.writers, args.readers, args.phase_seconds, args.interval, args.fillfactor, args.index_salary)
+    print_table(samples, ["phase", "elapsed", "update_tps", "read_tps", "table_kb", "index_kb", "dead_tuples", "hot_pct", "vacuum_removed", "not_removable", "autovacuums"])
+    print()
+    print_table(summarize_phases(samples), ["phase", "update_tps", "read_tps", "table_kb", "index_kb", "not_removable"])
+
+
+if __name__ == "__main__":
+    main()
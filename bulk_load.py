@@ -0,0 +1,87 @@
+import argparse
+import os
+import random
+import time
+
+from benchmark import benchmark_database, print_table
+from connection_pool import create_pool
+
+SCALE_ROWS_VARIABLE = "ACID_SCALE_ROWS"
+INSERT = "INSERT INTO employee (name, salary) VALUES (%s, %s)"
+FIRST_NAMES = ["John", "Beth", "Dep", "Mary", "Bob", "Alan", "Jess", "Paul", "Amanda", "Eric", "Selma", "Dean", "Emma", "Rosie", "Hugo"]
+LAST_NAMES = ["Smith", "Lee", "Tunner", "Castle", "Fox", "Rock", "Tex", "Port", "Lang", "Wilson", "Bates", "Knox", "Crow", "Cole", "Cash"]
+
+
+def scale_rows(default=100000):
+    return int(os.environ.get(SCALE_ROWS_VARIABLE, default))
+
+
+def generate_employees(rows, seed=0):
+    generator = random.Random(seed)
+    for number in range(rows):
+        yield f"{generator.choice(FIRST_NAMES)} {generator.choice(LAST_NAMES)} {number}", float(generator.randrange(1000, 20000))
+
+
+def load_copy(conn, rows):
+    with conn.cursor() as cur:
+        with cur.copy("COPY employee (name, salary) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def load_executemany(conn, rows, batch_size=10000):
+    with conn.cursor() as cur:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                cur.executemany(INSERT, batch)
+                batch = []
+        if batch:
+            cur.executemany(INSERT, batch)
+
+
+def load_pipeline(conn, rows, batch_size=1000):
+    with conn.cursor() as cur:
+        with conn.pipeline() as pipeline:
+            for number, row in enumerate(rows, 1):
+                cur.execute(INSERT, row)
+                if number % batch_size == 0:
+                    pipeline.sync()
+
+
+LOADERS = {
+    "copy": load_copy,
+    "executemany": load_executemany,
+    "pipeline": load_pipeline,
+}
+
+
+def run_benchmark(conninfo, methods, rows):
+    results = []
+    with create_pool(conninfo) as pool:
+        for method in methods:
+            with pool.connection() as conn:
+                conn.execute("TRUNCATE employee RESTART IDENTITY")
+            with pool.connection() as conn:
+                started = time.perf_counter()
+                LOADERS[method](conn, generate_employees(rows))
+                conn.commit()
+                seconds = time.perf_counter() - started
+            results.append({"method": method, "rows": rows, "seconds": seconds, "rows_per_s": rows / seconds})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rows per second loading the employee table with COPY, executemany and pipeline mode")
+    parser.add_argument("--method", nargs="+", choices=list(LOADERS), default=list(LOADERS))
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        results = run_benchmark(conninfo, args.method, args.rows)
+    print_table(results, ["method", "rows", "seconds", "rows_per_s"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+MIN_SIZE = 1
+MAX_SIZE = 4
+
+
+def reset_connection(conn):
+    conn.autocommit = True
+    conn.execute("RESET ALL")
+    conn.autocommit = False
+    conn.isolation_level = None
+    conn.read_only = None
+    conn.deferrable = None
+
+
+async def reset_async_connection(conn):
+    await conn.set_autocommit(True)
+    await conn.execute("RESET ALL")
+    await conn.set_autocommit(False)
+    await conn.set_isolation_level(None)
+    await conn.set_read_only(None)
+    await conn.set_deferrable(None)
+
+
+def create_pool(conninfo, min_size=MIN_SIZE, max_size=MAX_SIZE, **kwargs):
+    pool = ConnectionPool(conninfo, min_size=min_size, max_size=max_size, reset=reset_connection, open=False, **kwargs)
+    pool.open(wait=True)
+    return pool
+
+
+async def create_async_pool(conninfo, min_size=MIN_SIZE, max_size=MAX_SIZE, **kwargs):
+    pool = AsyncConnectionPool(conninfo, min_size=min_size, max_size=max_size, reset=reset_async_connection, open=False, **kwargs)
+    await pool.open(wait=True)
+    return pool
+
+
+def pool_stats(pool):
+    stats = pool.get_stats()
+    return {
+        "checkouts": stats.get("requests_num", 0),
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "connections_created": stats.get("connections_num", 0),
+    }
@@ -0,0 +1,59 @@
+import datetime
+import re
+import time
+
+import psycopg
+
+REDO_DONE = re.compile(r"redo done at \S+ system usage: .*elapsed: ([\d.]+) s")
+
+
+class ContainerServer:
+
+    def __init__(self, container):
+        self.container = container
+        self.restarted_at = None
+
+    def crash(self):
+        wrapped = self.container.get_wrapped_container()
+        wrapped.kill(signal="SIGKILL")
+        wrapped.wait()
+
+    def restart(self):
+        self.restarted_at = datetime.datetime.now(datetime.timezone.utc)
+        self.container.get_wrapped_container().start()
+
+    def recovery_log(self):
+        logs = self.container.get_wrapped_container().logs(since=self.restarted_at)
+        return logs.decode(errors="replace")
+
+
+def wait_until_ready(connection_uri, timeout=60):
+    started = time.perf_counter()
+    while True:
+        try:
+            with psycopg.connect(connection_uri(), connect_timeout=1):
+                return time.perf_counter() - started
+        except psycopg.OperationalError:
+            if time.perf_counter() - started > timeout:
+                raise
+            time.sleep(0.01)
+
+
+def redo_seconds(log):
+    matches = REDO_DONE.findall(log)
+    return float(matches[-1]) if matches else 0.0
+
+
+def wal_since_checkpoint(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), redo_lsn)::bigint FROM pg_control_checkpoint()")
+        wal_bytes, = cur.fetchone()
+    return wal_bytes
+
+
+def crash_and_recover(server, connection_uri):
+    server.crash()
+    started = time.perf_counter()
+    server.restart()
+    wait_until_ready(connection_uri)
+    return {"ready_seconds": time.perf_counter() - started, "redo_seconds": redo_seconds(server.recovery_log())}
@@ -0,0 +1,152 @@
+from threading import Barrier, Thread
+import argparse
+import random
+import statistics
+import time
+
+import psycopg
+
+from benchmark import benchmark_database, print_table
+from benchmark_isolation import seed
+
+LOCK_TIMEOUT = "30s"
+
+
+def ring(order):
+    return [[order[number], order[(number + 1) % len(order)]] for number in range(len(order))]
+
+
+def orderings(transactions, seed=0):
+    rows = list(range(1, transactions + 1))
+    shuffled = rows[:]
+    random.Random(seed + transactions).shuffle(shuffled)
+    return {
+        "forward": ring(rows),
+        "reverse": ring(rows[::-1]),
+        "shuffled": ring(shuffled),
+    }
+
+
+class DeadlockOutcome:
+
+    def __init__(self, locks, bystanders, deadlock_timeout, statuses, closed, detected, waits):
+        self.locks = locks
+        self.bystanders = bystanders
+        self.deadlock_timeout = deadlock_timeout
+        self.statuses = statuses
+        self.closed = closed
+        self.detected = detected
+        self.waits = waits
+
+    @property
+    def victims(self):
+        return [number for number, status in enumerate(self.statuses) if status == "deadlock"]
+
+    @property
+    def committed(self):
+        return [number for number, status in enumerate(self.statuses) if status == "committed"]
+
+    @property
+    def detection_seconds(self):
+        return self.detected - self.closed if self.detected else None
+
+    @property
+    def victim_wait_seconds(self):
+        return max(self.waits[number] for number in self.victims) if self.victims else None
+
+
+def wait_for_cycle(conn, pids, statuses, members):
+    while all(status == "running" for status in statuses[:members]):
+        cur = conn.execute("SELECT count(DISTINCT pid) FROM pg_locks WHERE NOT granted AND pid = ANY(%s)", (pids,))
+        waiting, = cur.fetchone()
+        if waiting == members:
+            return
+        time.sleep(0.001)
+
+
+def run_deadlock(conninfo, locks, deadlock_timeout="1s", bystanders=0):
+    members = len(locks)
+    transactions = members + bystanders
+    rows = sorted({row for order in locks for row in order})
+    statuses = ["running"] * transactions
+    pids = [None] * members
+    requested = [None] * transactions
+    waits = [0.0] * transactions
+    detected = []
+    barrier = Barrier(transactions)
+
+    def transaction(number):
+        with psycopg.connect(conninfo) as conn:
+            conn.execute("SELECT set_config('deadlock_timeout', %s, false), set_config('lock_timeout', %s, false)", (deadlock_timeout, LOCK_TIMEOUT))
+            conn.commit()
+            try:
+                if number < members:
+                    pids[number] = conn.info.backend_pid
+                    first, *rest = locks[number]
+                    conn.execute("UPDATE employee SET salary = salary + 1 WHERE id = %s", (first,))
+                    barrier.wait()
+                else:
+                    rest = [rows[(number - members) % len(rows)]]
+                    barrier.wait()
+                    wait_for_cycle(conn, pids, statuses, members)
+                    conn.commit()
+                for id_employee in rest:
+                    requested[number] = time.perf_counter()
+                    conn.execute("UPDATE employee SET salary = salary + 1 WHERE id = %s", (id_employee,))
+                conn.commit()
+                statuses[number] = "committed"
+            except psycopg.errors.DeadlockDetected:
+                detected.append(time.perf_counter())
+                statuses[number] = "deadlock"
+                conn.rollback()
+            except psycopg.Error as error:
+                statuses[number] = type(error).__name__
+                conn.rollback()
+            finally:
+                waits[number] = time.perf_counter() - requested[number] if requested[number] else 0.0
+
+    threads = [Thread(target=transaction, args=(number,)) for number in range(transactions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return DeadlockOutcome(locks, bystanders, deadlock_timeout, statuses, max(requested[:members]), min(detected) if detected else None, waits)
+
+
+def run_benchmark(conninfo, transaction_counts, deadlock_timeouts, bystanders=0, repeats=3):
+    results = []
+    for transactions in transaction_counts:
+        with psycopg.connect(conninfo) as conn:
+            seed(conn, transactions, [3000])
+        for deadlock_timeout in deadlock_timeouts:
+            for name, locks in orderings(transactions).items():
+                outcomes = [run_deadlock(conninfo, locks, deadlock_timeout, bystanders) for _ in range(repeats)]
+                detections = [outcome.detection_seconds for outcome in outcomes if outcome.detection_seconds is not None]
+                results.append({
+                    "transactions": transactions,
+                    "bystanders": bystanders,
+                    "ordering": name,
+                    "deadlock_timeout": deadlock_timeout,
+                    "victims": statistics.mean(len(outcome.victims) for outcome in outcomes),
+                    "detection_ms": statistics.median(detections) * 1000 if detections else 0.0,
+                    "victim_wait_ms": statistics.median(outcome.victim_wait_seconds or 0.0 for outcome in outcomes) * 1000,
+                    "max_stall_ms": max(max(outcome.waits) for outcome in outcomes) * 1000,
+                })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Close lock cycles on employee across N transactions and measure how long Postgres takes to pick a deadlock victim")
+    parser.add_argument("--transactions", nargs="+", type=int, default=[2, 4, 8, 16, 32], help="transactions in the lock cycle")
+    parser.add_argument("--deadlock-timeout", nargs="+", default=["10ms", "100ms", "1s"])
+    parser.add_argument("--bystanders", type=int, default=0, help="extra transactions queued on the cycle's rows")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with benchmark_database() as conninfo:
+        results = run_benchmark(conninfo, args.transactions, args.deadlock_timeout, args.bystanders, args.repeats)
+    print_table(results, ["transactions", "bystanders", "ordering", "deadlock_timeout", "victims", "detection_ms", "victim_wait_ms", "max_stall_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+from contextlib import contextmanager
+from threading import Lock, Thread
+import argparse
+import itertools
+import json
+import random
+import time
+
+import psycopg
+
+from benchmark import ISOLATION_LEVELS, benchmark_database
+from bulk_load import INSERT
+from connection_pool import create_pool
+from serializability import Transaction, check
+
+
+class TransactionRecord:
+
+    def __init__(self, process):
+        self.process = process
+        self.ops = []
+
+    def read(self, key, value):
+        self.ops.append(["r", key, value])
+
+    def write(self, key, value, previous):
+        self.ops.append(["w", key, value, previous])
+
+
+class HistoryRecorder:
+
+    def __init__(self):
+        self.transactions = []
+        self.ids = itertools.count()
+        self.values = itertools.count(1)
+        self.lock = Lock()
+
+    def unique_value(self):
+        return float(next(self.values))
+
+    def add(self, record, status):
+        with self.lock:
+            self.transactions.append(Transaction(next(self.ids), record.process, status, record.ops))
+
+    @contextmanager
+    def transaction(self, conn, process):
+        record = TransactionRecord(process)
+        try:
+            with conn.transaction():
+                yield record
+        except Exception:
+            self.add(record, "info" if conn.broken else "fail")
+            raise
+        self.add(record, "ok")
+
+    def save(self, path):
+        with open(path, "w") as file:
+            for transaction in self.transactions:
+                file.write(json.dumps(transaction.as_dict(), separators=(",", ":")) + "\n")
+
+
+def load(path):
+    with open(path) as file:
+        return [Transaction.from_dict(json.loads(line)) for line in file if line.strip()]
+
+
+def read_salary(cur, record, id_employee):
+    cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+    salary, = cur.fetchone()
+    record.read(id_employee, salary)
+    return salary
+
+
+def write_salary(cur, record, id_employee, salary):
+    cur.execute("SELECT salary FROM employee WHERE id = %s FOR UPDATE", (id_employee,))
+    previous, = cur.fetchone()
+    cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (salary, id_employee))
+    record.write(id_employee, salary, previous)
+
+
+def random_transaction(recorder, cur, record, generator, keys, max_ops):
+    for _ in range(generator.randint(1, max_ops)):
+        id_employee = generator.randint(1, keys)
+        if generator.random() < 0.5:
+            read_salary(cur, record, id_employee)
+        else:
+            write_salary(cur, record, id_employee, recorder.unique_value())
+
+
+def record_workload(conninfo, isolation_level, clients, duration, keys, max_ops=4, seed=0):
+    recorder = HistoryRecorder()
+    with create_pool(conninfo, min_size=clients, max_size=clients) as pool:
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("TRUNCATE employee RESTART IDENTITY")
+                cur.executemany(INSERT, [(f"Employee {number}", 0.0) for number in range(keys)])
+
+        deadline = time.perf_counter() + duration
+
+        def client(process):
+            generator = random.Random(seed + process)
+            with pool.connection() as conn:
+                conn.isolation_level = isolation_level
+                while time.perf_counter() < deadline:
+                    try:
+                        with recorder.transaction(conn, process) as record:
+                            with conn.cursor() as cur:
+                                random_transaction(recorder, cur, record, generator, keys, max_ops)
+                    except psycopg.Error:
+                        if conn.broken:
+                            raise
+
+        threads = [Thread(target=client, args=(process,)) for process in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    return recorder
+
+
+def serial_history(operations, keys, seed=0, max_ops=4):
+    generator = random.Random(seed)
+    state = {key: 0.0 for key in range(1, keys + 1)}
+    values = itertools.count(1)
+    transactions = []
+    total = 0
+    while total < operations:
+        ops = []
+        for _ in range(generator.randint(1, max_ops)):
+            key = generator.randint(1, keys)
+            if generator.random() < 0.5:
+                ops.append(["r", key, state[key]])
+            else:
+                value = float(next(values))
+                ops.append(["w", key, value, state[key]])
+                state[key] = value
+        transactions.append(Transaction(len(transactions), len(transactions) % 8, "ok", ops))
+        total += len(ops)
+    return transactions
+
+
+def print_result(result, seconds):
+    print(f"{result['transactions']} transactions, {result['operations']} operations, {result['edges']} dependency edges, checked in {seconds:.3f}s")
+    for name, count in result["counts"].items():
+        print(f"{name:>9}: {count}")
+    for name, cycles in result["witnesses"].items():
+        for cycle in cycles:
+            print(f"{name:>9} witness: {' -> '.join(str(node) for node in cycle)}")
+
+
+def timed_check(transactions):
+    started = time.perf_counter()
+    result = check(transactions)
+    return result, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record transaction histories on the employee table and check them for G0/G1/G2 anomalies")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="run a randomized read/write workload and record its history")
+    record.add_argument("--isolation", choices=list(ISOLATION_LEVELS), default="serializable")
+    record.add_argument("--clients", type=int, default=8)
+    record.add_argument("--duration", type=float, default=5)
+    record.add_argument("--keys", type=int, default=10, help="employee rows the clients read and write")
+    record.add_argument("--output", default="history.jsonl")
+
+    check_history = commands.add_parser("check", help="check a recorded history")
+    check_history.add_argument("path")
+
+    synthetic = commands.add_parser("synthetic", help="check a generated serial history to time the checker")
+    synthetic.add_argument("--operations", type=int, default=100000)
+    synthetic.add_argument("--keys", type=int, default=100)
+
+    args = parser.parse_args(argv)
+    if args.command == "record":
+        with benchmark_database() as conninfo:
+            recorder = record_workload(conninfo, ISOLATION_LEVELS[args.isolation], args.clients, args.duration, args.keys)
+        recorder.save(args.output)
+        transactions = recorder.transactions
+    elif args.command == "check":
+        transactions = load(args.path)
+    else:
+        transactions = serial_history(args.operations, args.keys)
+    print_result(*timed_check(transactions))
+
+
+if __name__ == "__main__":
+    main()
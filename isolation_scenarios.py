@@ -0,0 +1,166 @@
+import argparse
+import math
+
+from psycopg import IsolationLevel
+
+from benchmark import benchmark_database, print_table
+from scenarios import Scenario, explore
+
+
+def dirty_read(isolation_level, anomaly=False):
+    return Scenario(
+        f"dirty read ({isolation_level.name.lower()})",
+        isolation_level,
+        [(1, "John Smith", 2500)],
+        {
+            "t1": ["UPDATE employee SET salary = 3500 WHERE id = 1", "ROLLBACK"],
+            "t2": ["SELECT salary AS seen FROM employee WHERE id = 1"],
+        },
+        "SELECT salary FROM employee WHERE id = 1",
+        lambda outcome: outcome.values["t2"].get("seen", 2500) == 2500 and outcome.final == [(2500,)],
+        anomaly,
+    )
+
+
+def non_repeatable_read(isolation_level, anomaly=False):
+    return Scenario(
+        f"non-repeatable read ({isolation_level.name.lower()})",
+        isolation_level,
+        [(1, "Beth Lee", 3000)],
+        {
+            "t1": ["SELECT salary AS first FROM employee WHERE id = 1", "SELECT salary AS second FROM employee WHERE id = 1"],
+            "t2": ["UPDATE employee SET salary = 4000 WHERE id = 1"],
+        },
+        "SELECT salary FROM employee WHERE id = 1",
+        lambda outcome: outcome.values["t1"].get("first") == outcome.values["t1"].get("second"),
+        anomaly,
+    )
+
+
+def lost_update(isolation_level, anomaly=False):
+    def invariant(outcome):
+        expected = 4000 * (1.1 if "t1" in outcome.committed else 1) * (1.2 if "t2" in outcome.committed else 1)
+        return math.isclose(outcome.final[0][0], expected)
+
+    return Scenario(
+        f"lost update ({isolation_level.name.lower()})",
+        isolation_level,
+        [(1, "Mary Castle", 4000)],
+        {
+            "t1": ["SELECT salary FROM employee WHERE id = 1", "UPDATE employee SET salary = %(salary)s * 1.1 WHERE id = 1"],
+            "t2": ["SELECT salary FROM employee WHERE id = 1", "UPDATE employee SET salary = %(salary)s * 1.2 WHERE id = 1"],
+        },
+        "SELECT salary FROM employee WHERE id = 1",
+        invariant,
+        anomaly,
+    )
+
+
+def read_skew(isolation_level, anomaly=False):
+    return Scenario(
+        f"read skew ({isolation_level.name.lower()})",
+        isolation_level,
+        [(1, "Amanda Lang", 4000), (2, "August Morse", 4000)],
+        {
+            "t1": ["SELECT salary AS salary1 FROM employee WHERE id = 1", "SELECT salary AS salary2 FROM employee WHERE id = 2"],
+            "t2": ["UPDATE employee SET salary = 5000 WHERE id = 1", "UPDATE employee SET salary = 5000 WHERE id = 2"],
+        },
+        "SELECT salary FROM employee ORDER BY id",
+        lambda outcome: outcome.values["t1"].get("salary1") == outcome.values["t1"].get("salary2"),
+        anomaly,
+    )
+
+
+def write_skew(isolation_level, anomaly=False):
+    def invariant(outcome):
+        expected = {0: 14000, 1: 15400, 2: 16940}[len(outcome.committed)]
+        return math.isclose(sum(salary for salary, in outcome.final), expected)
+
+    return Scenario(
+        f"write skew ({isolation_level.name.lower()})",
+        isolation_level,
+        [(1, "Selma Bates", 5000), (2, "Samuel Bowen", 9000)],
+        {
+            "t1": ["SELECT SUM(salary) AS total FROM employee", "UPDATE employee SET salary = salary + 0.1 * %(total)s WHERE id = 1"],
+            "t2": ["SELECT SUM(salary) AS total FROM employee", "UPDATE employee SET salary = salary + 0.1 * %(total)s WHERE id = 2"],
+        },
+        "SELECT salary FROM employee",
+        invariant,
+        anomaly,
+    )
+
+
+def phantom_read(isolation_level, anomaly=False):
+    return Scenario(
+        f"phantom read ({isolation_level.name.lower()})",
+        isolation_level,
+        [(1, "Alan Rock", 2500), (2, "Jess Tex", 3000)],
+        {
+            "t1": ["SELECT SUM(salary) AS first FROM employee", "SELECT SUM(salary) AS second FROM employee"],
+            "t2": ["INSERT INTO employee (id, name, salary) VALUES (3, 'Emma Crow', 3500)"],
+        },
+        "SELECT SUM(salary) FROM employee",
+        lambda outcome: outcome.values["t1"].get("first") == outcome.values["t1"].get("second"),
+        anomaly,
+    )
+
+
+def lost_update_three_clients(isolation_level, anomaly=False):
+    def invariant(outcome):
+        expected = 4000
+        for name, factor in (("t1", 1.1), ("t2", 1.2), ("t3", 1.3)):
+            if name in outcome.committed:
+                expected *= factor
+        return math.isclose(outcome.final[0][0], expected)
+
+    return Scenario(
+        f"lost update, three clients ({isolation_level.name.lower()})",
+        isolation_level,
+        [(1, "Mary Castle", 4000)],
+        {
+            name: ["SELECT salary FROM employee WHERE id = 1", f"UPDATE employee SET salary = %(salary)s * {factor} WHERE id = 1"]
+            for name, factor in (("t1", 1.1), ("t2", 1.2), ("t3", 1.3))
+        },
+        "SELECT salary FROM employee WHERE id = 1",
+        invariant,
+        anomaly,
+    )
+
+
+SCENARIOS = [
+    dirty_read(IsolationLevel.READ_UNCOMMITTED),
+    non_repeatable_read(IsolationLevel.READ_COMMITTED, anomaly=True),
+    non_repeatable_read(IsolationLevel.REPEATABLE_READ),
+    lost_update(IsolationLevel.READ_COMMITTED, anomaly=True),
+    lost_update(IsolationLevel.REPEATABLE_READ),
+    read_skew(IsolationLevel.READ_COMMITTED, anomaly=True),
+    read_skew(IsolationLevel.REPEATABLE_READ),
+    write_skew(IsolationLevel.REPEATABLE_READ, anomaly=True),
+    write_skew(IsolationLevel.SERIALIZABLE),
+    phantom_read(IsolationLevel.READ_COMMITTED, anomaly=True),
+    phantom_read(IsolationLevel.REPEATABLE_READ),
+    lost_update_three_clients(IsolationLevel.READ_COMMITTED, anomaly=True),
+    lost_update_three_clients(IsolationLevel.REPEATABLE_READ),
+]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run every distinct interleaving of the declared isolation scenarios and check their invariants")
+    parser.add_argument("scenarios", nargs="*", help="scenario names (default: all)")
+    parser.add_argument("--workers", type=int, default=8, help="schedules executed concurrently")
+    parser.add_argument("--violations", type=int, default=3, help="violating schedules to print per scenario")
+    args = parser.parse_args(argv)
+
+    selected = [scenario for scenario in SCENARIOS if not args.scenarios or scenario.name in args.scenarios]
+    results = []
+    with benchmark_database() as conninfo:
+        for scenario in selected:
+            exploration = explore(conninfo, scenario, args.workers)
+            results.append(exploration.summary())
+            for outcome in exploration.violations[:args.violations]:
+                print(f"{scenario.name}: {outcome.describe()}")
+    print_table(results, ["scenario", "interleavings", "runs", "states", "schedules", "distinct", "violations", "expected", "passed", "seconds"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+from multiprocessing.sharedctypes import RawArray
+import ctypes
+import math
+import multiprocessing
+import time
+
+from benchmark import ISOLATION_LEVELS, run_clients
+from benchmark_isolation import WORKLOADS
+from connection_pool import create_pool
+
+SUB_BITS = 5
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_MICROSECONDS = (1 << 36) - 1
+
+
+def bucket(microseconds):
+    shift = max(microseconds.bit_length() - SUB_BITS - 1, 0)
+    return shift * SUB_BUCKETS + (microseconds >> shift)
+
+
+def bucket_bounds(index):
+    shift = max(index // SUB_BUCKETS - 1, 0)
+    low = (index - shift * SUB_BUCKETS) << shift
+    return low, low + (1 << shift)
+
+
+BUCKETS = bucket(MAX_MICROSECONDS) + 1
+
+
+class Histogram:
+
+    def __init__(self, counts=None):
+        self.counts = counts if counts is not None else [0] * BUCKETS
+
+    def record(self, seconds):
+        self.counts[bucket(min(int(seconds * 1_000_000), MAX_MICROSECONDS))] += 1
+
+    def merge(self, other):
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        return self
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def percentile(self, fraction):
+        total = self.total
+        if not total:
+            return 0.0
+        rank = min(max(math.ceil(fraction * total), 1), total)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return (low + high - 1) / 2 / 1_000_000
+        return 0.0
+
+
+class SharedResults:
+
+    def __init__(self, processes, clients):
+        self.processes = processes
+        self.clients = clients
+        self.histograms = RawArray(ctypes.c_uint64, clients * BUCKETS)
+        self.counters = RawArray(ctypes.c_uint64, processes * 3)
+        self.seconds = RawArray(ctypes.c_double, processes)
+        self.cpu_seconds = RawArray(ctypes.c_double, processes)
+
+    def histogram(self, client):
+        return Histogram(memoryview(self.histograms).cast("B").cast("Q")[client * BUCKETS:(client + 1) * BUCKETS])
+
+    def merged(self):
+        merged = Histogram()
+        for client in range(self.clients):
+            merged.merge(self.histogram(client))
+        return merged
+
+    def run(self):
+        counters = list(self.counters)
+        return {
+            "clients": self.clients,
+            "processes": self.processes,
+            "seconds": max(self.seconds),
+            "commits": sum(counters[0::3]),
+            "aborts": sum(counters[1::3]),
+            "observed": sum(counters[2::3]),
+            "histogram": self.merged(),
+            "cpu_pct": 100 * sum(self.cpu_seconds) / max(self.seconds) if max(self.seconds) else 0.0,
+        }
+
+
+def split(clients, processes):
+    return [clients // processes + (1 if number < clients % processes else 0) for number in range(processes)]
+
+
+def worker(conninfo, workload_name, rows, isolation_level, duration, number, first_client, clients, connections, shared, start):
+    workload = WORKLOADS[workload_name](rows)
+    histograms = [shared.histogram(first_client + client) for client in range(clients)]
+    began = []
+
+    def ready():
+        start.wait()
+        began.append((time.perf_counter(), time.process_time()))
+
+    record = lambda client, seconds: histograms[client].record(seconds)
+    with create_pool(conninfo, min_size=connections, max_size=connections) as pool:
+        run = run_clients(pool, clients, duration, workload.transaction, ISOLATION_LEVELS[isolation_level], hold_connections=clients <= connections, ready=ready, record=record)
+        shared.seconds[number] = time.perf_counter() - began[0][0]
+        shared.cpu_seconds[number] = time.process_time() - began[0][1]
+    offset = number * 3
+    shared.counters[offset:offset + 3] = [run["commits"], run["aborts"], run["observed"]]
+
+
+def run_processes(conninfo, workload_name, rows, clients, processes, duration, isolation_level="read committed", connections=None):
+    per_process = [count for count in split(clients, processes) if count]
+    connections_per_process = split(min(clients, connections or clients), len(per_process))
+    shared = SharedResults(len(per_process), clients)
+    context = multiprocessing.get_context("spawn")
+    start = context.Barrier(len(per_process))
+    workers = []
+    first_client = 0
+    for number, count in enumerate(per_process):
+        args = (conninfo, workload_name, rows, isolation_level, duration, number, first_client, count, max(connections_per_process[number], 1), shared, start)
+        workers.append(context.Process(target=worker, args=args))
+        first_client += count
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    failed = [process.exitcode for process in workers if process.exitcode]
+    if failed:
+        raise RuntimeError(f"{len(failed)} load generator process(es) failed with exit codes {failed}")
+    return shared.run()
+
+
+def summarize_histogram(run):
+    attempts = run["commits"] + run["aborts"]
+    return {
+        "clients": run["clients"],
+        "tps": run["commits"] / run["seconds"] if run["seconds"] else 0.0,
+        "p50_ms": run["histogram"].percentile(0.50) * 1000,
+        "p99_ms": run["histogram"].percentile(0.99) * 1000,
+        "abort_rate": run["aborts"] / attempts if attempts else 0.0,
+    }
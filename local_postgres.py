@@ -0,0 +1,96 @@
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+
+BIN_VARIABLE = "ACID_PG_BIN"
+CACHE_VARIABLE = "ACID_PG_CACHE"
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "acidwithtests")
+
+
+def find_bindir():
+    if os.environ.get(BIN_VARIABLE):
+        return os.environ[BIN_VARIABLE]
+    pg_ctl = shutil.which("pg_ctl")
+    return os.path.dirname(pg_ctl) if pg_ctl else None
+
+
+def runtime_root():
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+class LocalPostgres:
+
+    def __init__(self, bindir, settings, cache_key):
+        self.bindir = bindir
+        self.settings = settings
+        self.cache_dir = os.path.join(os.environ.get(CACHE_VARIABLE, DEFAULT_CACHE), f"pgdata-{cache_key}")
+        self.data_dir = None
+        self.port = None
+        self.timings = {}
+
+    def run(self, program, *args):
+        completed = subprocess.run([os.path.join(self.bindir, program), *args], capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"{program} failed: {completed.stderr.strip() or completed.stdout.strip()}")
+        return completed.stdout
+
+    def options(self):
+        settings = {"port": self.port, "listen_addresses": "localhost", "unix_socket_directories": self.data_dir, **self.settings}
+        return " ".join(f"-c {name}={value}" for name, value in settings.items())
+
+    def pg_ctl_start(self):
+        self.run("pg_ctl", "-D", self.data_dir, "-l", os.path.join(self.data_dir, "server.log"), "-o", self.options(), "-w", "start")
+
+    def prepare(self, initialize):
+        if os.path.exists(os.path.join(self.cache_dir, "PG_VERSION")):
+            return False
+        started = time.perf_counter()
+        os.makedirs(os.path.dirname(self.cache_dir), exist_ok=True)
+        self.data_dir = f"{self.cache_dir}.{os.getpid()}"
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        self.run("initdb", "-D", self.data_dir, "-U", "postgres", "--auth=trust", "--encoding=UTF8", "--no-sync")
+        self.port = free_port()
+        self.pg_ctl_start()
+        try:
+            initialize(self.connection_url())
+        finally:
+            self.run("pg_ctl", "-D", self.data_dir, "-m", "fast", "-w", "stop")
+        os.remove(os.path.join(self.data_dir, "server.log"))
+        try:
+            os.rename(self.data_dir, self.cache_dir)
+        except OSError:
+            shutil.rmtree(self.data_dir)
+        self.timings["initdb"] = time.perf_counter() - started
+        return True
+
+    def start(self, initialize):
+        self.prepare(initialize)
+        started = time.perf_counter()
+        self.data_dir = tempfile.mkdtemp(prefix="acid_pgdata_", dir=runtime_root())
+        shutil.copytree(self.cache_dir, self.data_dir, dirs_exist_ok=True)
+        os.chmod(self.data_dir, 0o700)
+        self.timings["copy"] = time.perf_counter() - started
+        started = time.perf_counter()
+        self.port = free_port()
+        self.pg_ctl_start()
+        self.timings["pg_ctl start"] = time.perf_counter() - started
+        return self
+
+    def stop(self):
+        if self.data_dir is None:
+            return
+        self.run("pg_ctl", "-D", self.data_dir, "-m", "immediate", "-w", "stop")
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+        self.data_dir = None
+
+    def connection_url(self, database="postgres"):
+        return f"postgresql://postgres@localhost:{self.port}/{database}"
@@ -0,0 +1,183 @@
+from threading import Event, Thread
+import re
+import time
+
+import psycopg
+
+TIMELINE_VARIABLE = "ACID_LOCK_TIMELINE"
+TIMINGS_VARIABLE = "ACID_LOCK_TIMELINE_TIMINGS"
+SAMPLE = """
+SELECT sampled_at, a.pid, a.state, a.xact_start, a.query_start, a.wait_event_type, a.query,
+       CASE WHEN a.wait_event_type = 'Lock' THEN pg_blocking_pids(a.pid) END,
+       CASE WHEN a.wait_event_type = 'Lock' THEN (
+           SELECT l.locktype || ' ' || l.mode || coalesce(' on ' || l.relation::regclass::text, '')
+           FROM pg_locks l WHERE l.pid = a.pid AND NOT l.granted LIMIT 1
+       ) END
+FROM (SELECT clock_timestamp() AS sampled_at) sample
+LEFT JOIN pg_stat_activity a
+    ON a.datname = current_database() AND a.pid <> pg_backend_pid() AND a.backend_type = 'client backend'
+"""
+WHITESPACE = re.compile(r"\s+")
+
+
+def statement_text(query, limit=80):
+    text = WHITESPACE.sub(" ", query or "").strip()
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+
+class TransactionTimeline:
+
+    def __init__(self, label, number, started):
+        self.label = label
+        self.number = number
+        self.started = started
+        self.events = []
+        self.waiting_since = None
+
+    def add(self, at, event):
+        self.events.append(((at - self.started).total_seconds() * 1000, event))
+
+
+class ActivitySampler:
+
+    def __init__(self, conninfo, interval=0.001):
+        self.conninfo = conninfo
+        self.interval = interval
+        self.labels = {}
+        self.backends = {}
+        self.transactions = []
+        self.open = {}
+        self.samples = 0
+        self.sample_seconds = 0
+        self.started = None
+        self.stopping = Event()
+        self.thread = None
+
+    def label(self, conn, name):
+        self.labels[conn.info.backend_pid] = name
+
+    def label_of(self, pid):
+        if pid not in self.labels:
+            self.labels[pid] = f"backend{len(self.labels) + 1}"
+        return self.labels[pid]
+
+    def start(self):
+        self.conn = psycopg.connect(self.conninfo, autocommit=True)
+        self.conn.execute("SET application_name = 'lock_monitor'")
+        self.thread = Thread(target=self.run, name="lock_monitor", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+        self.conn.close()
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def run(self):
+        while not self.stopping.is_set():
+            started = time.perf_counter()
+            try:
+                rows = self.conn.execute(SAMPLE, prepare=True).fetchall()
+            except psycopg.OperationalError:
+                return
+            self.sample_seconds += time.perf_counter() - started
+            self.samples += 1
+            self.observe(rows)
+            self.stopping.wait(self.interval)
+
+    def observe(self, rows):
+        now = rows[0][0]
+        if self.started is None:
+            self.started = now
+        seen = set()
+        for _, pid, state, xact_start, query_start, wait_event_type, query, blocking, lock in rows:
+            if pid is None:
+                continue
+            seen.add(pid)
+            previous = self.backends.get(pid, (None, None, None, None, None))
+            self.backends[pid] = (state, xact_start, query_start, wait_event_type, query)
+            previous_state, previous_xact_start, previous_query_start, previous_wait, previous_query = previous
+
+            if previous_xact_start is not None and xact_start != previous_xact_start:
+                self.finish(pid, now, query if xact_start is None else previous_query)
+            if xact_start is None:
+                continue
+            transaction = self.open.get(pid)
+            if transaction is None:
+                label = self.label_of(pid)
+                number = sum(1 for opened in self.transactions if opened.label == label) + 1
+                transaction = self.open[pid] = TransactionTimeline(label, number, xact_start)
+                self.transactions.append(transaction)
+                transaction.add(xact_start, "begin")
+
+            if query_start != previous_query_start and query_start >= xact_start:
+                transaction.add(query_start, f"statement {statement_text(query)}")
+            if state != "active" and (previous_state == "active" or query_start != previous_query_start):
+                transaction.add(now, "statement-end")
+            if wait_event_type == "Lock" and previous_wait != "Lock":
+                blockers = " ".join(self.label_of(blocker) for blocker in blocking or [])
+                transaction.add(now, f"lock-wait {lock} blocked-by {blockers}")
+                transaction.waiting_since = now
+            elif wait_event_type != "Lock" and previous_wait == "Lock":
+                transaction.add(now, "lock-acquired")
+                transaction.waiting_since = None
+            if state == "idle in transaction (aborted)" and previous_state != state:
+                transaction.add(now, "error")
+
+        for pid in list(self.backends):
+            if pid not in seen:
+                self.finish(pid, now, self.backends[pid][4])
+                del self.backends[pid]
+
+    def finish(self, pid, at, query):
+        transaction = self.open.pop(pid, None)
+        if transaction is None:
+            return
+        if transaction.waiting_since is not None:
+            transaction.add(at, "lock-acquired")
+        text = statement_text(query).upper()
+        if text.startswith("COMMIT") or text.startswith("END"):
+            transaction.add(at, "commit")
+        elif text.startswith("ROLLBACK") or text.startswith("ABORT"):
+            transaction.add(at, "abort")
+        else:
+            transaction.add(at, "end")
+
+    def timeline(self, timings=False):
+        # without timings the lines only carry event order and blockers, so runs diff cleanly
+        lines = []
+        for transaction in sorted(self.transactions, key=lambda transaction: (transaction.label, transaction.number)):
+            header = f"{transaction.label} #{transaction.number}"
+            if timings:
+                offset = (transaction.started - self.started).total_seconds() * 1000
+                header += f" at {max(offset, 0):.1f}ms"
+            lines.append(header)
+            waiting_since = None
+            for elapsed, event in transaction.events:
+                if not timings:
+                    lines.append(f"  {event}")
+                    continue
+                if event.startswith("lock-wait"):
+                    waiting_since = elapsed
+                elif event == "lock-acquired" and waiting_since is not None:
+                    event += f" waited {elapsed - waiting_since:.0f}ms"
+                lines.append(f"  +{elapsed:.1f}ms {event}")
+        return lines
+
+    def summary(self):
+        mean_ms = self.sample_seconds / self.samples * 1000 if self.samples else 0
+        return f"# {self.samples} samples, {mean_ms:.2f}ms per sample, {len(self.transactions)} transactions"
+
+    def write(self, path, timings=False):
+        with open(path, "w") as file:
+            if timings:
+                file.write(self.summary() + "\n")
+            for line in self.timeline(timings):
+                file.write(line + "\n")
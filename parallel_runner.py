@@ -0,0 +1,141 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+import unittest
+
+from postgres_session import SERVER_URL_VARIABLE, session
+
+
+class CollectingResult(unittest.TestResult):
+
+    def __init__(self):
+        super().__init__()
+        self.outcomes = []
+        self.started = time.perf_counter()
+
+    def startTest(self, test):
+        super().startTest(test)
+        self.started = time.perf_counter()
+
+    def record(self, test, outcome, detail=""):
+        self.outcomes.append({
+            "id": test.id(),
+            "outcome": outcome,
+            "detail": detail,
+            "seconds": time.perf_counter() - self.started,
+            "pid": os.getpid(),
+        })
+        # class and module fixtures run before the next startTest, so their errors are timed from here
+        self.started = time.perf_counter()
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.record(test, "ok")
+
+    def addFailure(self, test, err):
+        super().addFailure(test, err)
+        self.record(test, "fail", self.failures[-1][1])
+
+    def addError(self, test, err):
+        super().addError(test, err)
+        self.record(test, "error", self.errors[-1][1])
+
+    def addSkip(self, test, reason):
+        super().addSkip(test, reason)
+        self.record(test, "skip", reason)
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self.record(test, "ok")
+
+    def addUnexpectedSuccess(self, test):
+        super().addUnexpectedSuccess(test)
+        self.record(test, "fail", "unexpected success")
+
+
+def iterate_tests(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from iterate_tests(test)
+        else:
+            yield test
+
+
+def needs_exclusive_server(test):
+    method = getattr(test, test._testMethodName, None)
+    return getattr(method, "requires_container", False)
+
+
+def run_tests(test_ids):
+    suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+    result = CollectingResult()
+    suite.run(result)
+    return result.outcomes
+
+
+def run_worker_tests(test_ids):
+    # the worker's own session report is merged into the parent's instead of printed at exit
+    return run_tests(test_ids), session.take_stats()
+
+
+def run_suite(tests, workers):
+    parallel = [test.id() for test in tests if not needs_exclusive_server(test)]
+    exclusive = [test.id() for test in tests if needs_exclusive_server(test)]
+
+    outcomes = []
+    with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        futures = [executor.submit(run_worker_tests, [test_id]) for test_id in parallel]
+        for future in as_completed(futures):
+            worker_outcomes, stats = future.result()
+            outcomes.extend(worker_outcomes)
+            session.merge_stats(stats)
+
+    if exclusive:
+        outcomes.extend(run_tests(exclusive))
+    return sorted(outcomes, key=lambda outcome: outcome["id"])
+
+
+def print_report(outcomes, workers, seconds, stream=sys.stderr):
+    for outcome in outcomes:
+        if outcome["outcome"] in ("fail", "error"):
+            print("=" * 70, file=stream)
+            print(f"{outcome['outcome'].upper()}: {outcome['id']}", file=stream)
+            print("-" * 70, file=stream)
+            print(outcome["detail"], file=stream)
+
+    counts = {}
+    for outcome in outcomes:
+        counts[outcome["outcome"]] = counts.get(outcome["outcome"], 0) + 1
+    test_seconds = sum(outcome["seconds"] for outcome in outcomes)
+    print("-" * 70, file=stream)
+    print(f"Ran {len(outcomes)} tests in {seconds:.3f}s on {workers} worker(s) ({test_seconds:.3f}s of test time, {len({o['pid'] for o in outcomes})} process(es))", file=stream)
+    summary = ", ".join(f"{name}={counts[name]}" for name in ("fail", "error", "skip") if counts.get(name))
+    status = "FAILED" if counts.get("fail") or counts.get("error") else "OK"
+    print(f"{status} ({summary})" if summary else status, file=stream)
+    return status == "OK"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the test suite on a process pool sharing one Postgres server")
+    parser.add_argument("tests", nargs="*", help="test names (defaults to discovering test*.py)")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    if args.tests:
+        suite = unittest.defaultTestLoader.loadTestsFromNames(args.tests)
+    else:
+        suite = unittest.defaultTestLoader.discover(".")
+
+    started = time.perf_counter()
+    session.start()
+    os.environ.setdefault(SERVER_URL_VARIABLE, session.connection_uri())
+    outcomes = run_suite(list(iterate_tests(suite)), args.workers)
+    ok = print_report(outcomes, args.workers, time.perf_counter() - started)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,294 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import itertools
+import os
+import sys
+import time
+import unittest
+
+from testcontainers.postgres import PostgresContainer
+import psycopg
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+
+from connection_pool import MAX_SIZE, MIN_SIZE, create_async_pool, create_pool, pool_stats
+from crash_recovery import ContainerServer
+from local_postgres import LocalPostgres, find_bindir
+from lock_monitor import TIMELINE_VARIABLE, TIMINGS_VARIABLE, ActivitySampler
+
+IMAGE = "postgres:16.2-alpine"
+SERVER_URL_VARIABLE = "ACID_POSTGRES_URL"
+PROFILE_VARIABLE = "ACID_POSTGRES_PROFILE"
+TEMPLATE_DATABASE = "employee_template"
+MAX_CONNECTIONS = 300
+SCHEMA = [
+    "CREATE TABLE employee (id serial PRIMARY KEY, name text, salary double precision)",
+]
+FAST_SETTINGS = {"fsync": "off", "full_page_writes": "off", "synchronous_commit": "off"}
+PGDATA = "/var/lib/postgresql/data"
+
+
+def server_settings(profile):
+    settings = {"max_connections": MAX_CONNECTIONS}
+    if profile == "fast":
+        settings.update(FAST_SETTINGS)
+    return settings
+
+
+def cache_key(bindir):
+    version = LocalPostgres(bindir, {}, "").run("postgres", "--version")
+    return hashlib.sha256("\n".join([version, TEMPLATE_DATABASE, *SCHEMA]).encode()).hexdigest()[:12]
+
+
+class PostgresSession:
+
+    def __init__(self, image=IMAGE, profile=None, attach=True):
+        self.image = image
+        self.profile = profile or os.environ.get(PROFILE_VARIABLE, "durable")
+        self.attach = attach
+        self.container = None
+        self.local = None
+        self.durable = None
+        self.server_url = None
+        self.counter = itertools.count()
+        self.test_classes = set()
+        self.startup_seconds = 0
+        self.template_seconds = 0
+        self.clone_seconds = []
+        self.drop_seconds = []
+        self.pool_stats = {"checkouts": 0, "wait_ms": 0, "connections_created": 0}
+        self.timings = []
+        self.test_seconds = []
+
+    def start(self):
+        if self.container is None and self.server_url is None:
+            if self.attach and os.environ.get(SERVER_URL_VARIABLE):
+                self.server_url = os.environ[SERVER_URL_VARIABLE]
+                atexit.register(self.stop)
+                self.create_template()
+                return self
+
+            started = time.perf_counter()
+            settings = server_settings(self.profile)
+            if self.profile == "fast" and find_bindir():
+                self.local = LocalPostgres(find_bindir(), settings, cache_key(find_bindir()))
+                self.local.start(lambda uri: self.create_template(uri))
+                self.server_url = self.local.connection_url()
+                self.startup_seconds = time.perf_counter() - started
+                atexit.register(self.stop)
+                return self
+
+            command = "postgres " + " ".join(f"-c {name}={value}" for name, value in settings.items())
+            tmpfs = {PGDATA: "rw"} if self.profile == "fast" else {}
+            self.container = PostgresContainer(self.image, tmpfs=tmpfs).with_command(command)
+            self.container.start()
+            self.startup_seconds = time.perf_counter() - started
+            atexit.register(self.stop)
+
+            started = time.perf_counter()
+            self.create_template()
+            self.template_seconds = time.perf_counter() - started
+        return self
+
+    def stop(self):
+        if self.container is not None:
+            self.container.stop()
+            self.container = None
+        if self.local is not None:
+            self.local.stop()
+        if self.clone_seconds:
+            print(self.report(), file=sys.stderr)
+
+    def connection_uri(self, database=None):
+        if self.container is not None:
+            uri = self.container.get_connection_url().replace("+psycopg2", "")
+        else:
+            uri = self.server_url
+        if database is None:
+            return uri
+        return make_conninfo(uri, dbname=database)
+
+    def durable_session(self):
+        if self.profile != "fast" or self.local is None and self.container is None:
+            return self
+        if self.durable is None:
+            self.durable = PostgresSession(self.image, profile="durable", attach=False)
+        return self.durable.start()
+
+    def crash_server(self):
+        # the fast profile keeps PGDATA on tmpfs with fsync off, so only the durable server survives a crash
+        durable = self.durable_session()
+        if durable.container is None:
+            return None
+        return ContainerServer(durable.container)
+
+    def create_template(self, uri=None):
+        uri = uri or self.connection_uri()
+        with psycopg.connect(uri, autocommit=True) as conn:
+            cur = conn.execute("SELECT 1 FROM pg_database WHERE datname = %s", (TEMPLATE_DATABASE,))
+            if cur.fetchone():
+                return
+            conn.execute(sql.SQL("CREATE DATABASE {}").format(sql.Identifier(TEMPLATE_DATABASE)))
+        with psycopg.connect(make_conninfo(uri, dbname=TEMPLATE_DATABASE)) as conn:
+            with conn.cursor() as cur:
+                for statement in SCHEMA:
+                    cur.execute(statement)
+
+    def create_database(self):
+        database = f"employee_{os.getpid()}_{next(self.counter)}"
+        started = time.perf_counter()
+        with psycopg.connect(self.connection_uri(), autocommit=True) as conn:
+            conn.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(sql.Identifier(database), sql.Identifier(TEMPLATE_DATABASE)))
+        self.clone_seconds.append(time.perf_counter() - started)
+        return database
+
+    def drop_database(self, database):
+        started = time.perf_counter()
+        with psycopg.connect(self.connection_uri(), autocommit=True) as conn:
+            conn.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(database)))
+        self.drop_seconds.append(time.perf_counter() - started)
+
+    def record_pool(self, pool):
+        for name, value in pool_stats(pool).items():
+            self.pool_stats[name] += value
+
+    def record_timing(self, name, seconds):
+        self.timings.append((name, seconds))
+
+    def take_stats(self):
+        stats = {
+            "test_classes": sorted(self.test_classes),
+            "clone_seconds": self.clone_seconds,
+            "drop_seconds": self.drop_seconds,
+            "test_seconds": self.test_seconds,
+            "timings": self.timings,
+            "pool_stats": self.pool_stats,
+        }
+        self.test_classes = set()
+        self.clone_seconds, self.drop_seconds, self.test_seconds, self.timings = [], [], [], []
+        self.pool_stats = {name: 0 for name in self.pool_stats}
+        return stats
+
+    def merge_stats(self, stats):
+        self.test_classes.update(stats["test_classes"])
+        self.clone_seconds.extend(stats["clone_seconds"])
+        self.drop_seconds.extend(stats["drop_seconds"])
+        self.test_seconds.extend(stats["test_seconds"])
+        self.timings.extend(tuple(timing) for timing in stats["timings"])
+        for name, value in stats["pool_stats"].items():
+            self.pool_stats[name] += value
+
+    def report(self):
+        boots_saved = max(len(self.test_classes) - 1, 0)
+        clones = len(self.clone_seconds)
+        reset_seconds = sum(self.clone_seconds) + sum(self.drop_seconds)
+        lines = []
+        if self.local is not None:
+            steps = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in self.local.timings.items())
+            lines.append(f"postgres session: {self.profile} profile, local server on tmpfs started in {self.startup_seconds:.2f}s ({steps})")
+        elif self.server_url is None:
+            lines.append(f"postgres session: {self.profile} profile, startup {self.startup_seconds:.2f}s, template {self.template_seconds:.3f}s")
+            lines.append(f"postgres session: {boots_saved} container boot(s) avoided across {len(self.test_classes)} test class(es), ~{boots_saved * self.startup_seconds:.2f}s saved")
+        if clones:
+            lines.append(f"postgres session: {clones} database(s) cloned from template, reset {reset_seconds:.3f}s total ({reset_seconds / clones * 1000:.1f}ms per test)")
+        if self.test_seconds:
+            ordered = sorted(self.test_seconds)
+            lines.append(f"postgres session: {len(ordered)} test(s), {sum(ordered) / len(ordered) * 1000:.1f}ms mean, {ordered[len(ordered) // 2] * 1000:.1f}ms median, {ordered[-1] * 1000:.1f}ms slowest")
+        if self.pool_stats["checkouts"]:
+            lines.append("postgres session: pool {checkouts} checkout(s), {connections_created} connection(s) created, {wait_ms}ms waiting".format(**self.pool_stats))
+        for name, seconds in self.timings:
+            lines.append(f"postgres session: {name} in {seconds:.3f}s")
+        return "\n".join(lines)
+
+
+session = PostgresSession()
+
+
+def start_sampler(test_case):
+    if not os.environ.get(TIMELINE_VARIABLE):
+        return None
+    return ActivitySampler(test_case.connection_uri()).start()
+
+
+def write_timeline(test_case):
+    if test_case.sampler is not None:
+        os.makedirs(os.environ[TIMELINE_VARIABLE], exist_ok=True)
+        path = os.path.join(os.environ[TIMELINE_VARIABLE], f"{test_case.id()}.timeline")
+        test_case.sampler.stop().write(path, timings=bool(os.environ.get(TIMINGS_VARIABLE)))
+
+
+def requires_container(test):
+    @functools.wraps(test)
+    def wrapper(self, *args, **kwargs):
+        if self.session.crash_server() is None:
+            self.skipTest("needs the Postgres container owned by this session")
+        return test(self, *args, **kwargs)
+    wrapper.requires_container = True
+    return wrapper
+
+
+def session_for(test_case):
+    if getattr(getattr(test_case, test_case._testMethodName), "requires_container", False):
+        return session.durable_session()
+    return session
+
+
+class PostgresTestCase(unittest.TestCase):
+    pool_min_size = MIN_SIZE
+    pool_max_size = MAX_SIZE
+
+    @classmethod
+    def setUpClass(cls):
+        cls.postgres = session.start().container
+        session.test_classes.add(cls.__name__)
+
+    def setUp(self):
+        self.started = time.perf_counter()
+        self.session = session_for(self)
+        self.postgres = self.session.container
+        self.database = self.session.create_database()
+        self.sampler = start_sampler(self)
+        self.pool = create_pool(self.connection_uri(), min_size=self.pool_min_size, max_size=self.pool_max_size)
+
+    def tearDown(self):
+        self.session.record_pool(self.pool)
+        self.pool.close()
+        write_timeline(self)
+        self.session.drop_database(self.database)
+        self.session.test_seconds.append(time.perf_counter() - self.started)
+
+    def connection_uri(self):
+        return self.session.connection_uri(self.database)
+
+
+class AsyncPostgresTestCase(unittest.IsolatedAsyncioTestCase):
+    pool_min_size = MIN_SIZE
+    pool_max_size = MAX_SIZE
+
+    @classmethod
+    def setUpClass(cls):
+        cls.postgres = session.start().container
+        session.test_classes.add(cls.__name__)
+
+    async def asyncSetUp(self):
+        # IsolatedAsyncioTestCase gives every test a fresh loop in debug mode, which records a
+        # traceback for each callback and makes the pool-heavy tests several times slower
+        asyncio.get_running_loop().set_debug(False)
+        self.started = time.perf_counter()
+        self.session = session_for(self)
+        self.postgres = self.session.container
+        self.database = await asyncio.to_thread(self.session.create_database)
+        self.sampler = start_sampler(self)
+        self.pool = await create_async_pool(self.connection_uri(), min_size=self.pool_min_size, max_size=self.pool_max_size)
+
+    async def asyncTearDown(self):
+        self.session.record_pool(self.pool)
+        await self.pool.close()
+        write_timeline(self)
+        await asyncio.to_thread(self.session.drop_database, self.database)
+        self.session.test_seconds.append(time.perf_counter() - self.started)
+
+    def connection_uri(self):
+        return self.session.connection_uri(self.database)
@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+from threading import Lock
+import random
+import time
+
+import psycopg
+
+RETRYABLE_ERRORS = (psycopg.errors.SerializationFailure, psycopg.errors.DeadlockDetected)
+
+
+@contextmanager
+def pipeline_transaction(conn):
+    # conn.transaction() and the implicit BEGIN both sync the pipeline; sending BEGIN and COMMIT
+    # ourselves in autocommit mode leaves a single sync when the pipeline exits
+    begin = "BEGIN"
+    if conn.isolation_level is not None:
+        begin += " ISOLATION LEVEL " + conn.isolation_level.name.replace("_", " ")
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.pipeline():
+            conn.execute(begin)
+            yield conn
+            conn.execute("COMMIT")
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.autocommit = autocommit
+
+
+class RetryBudget:
+
+    def __init__(self, ratio=0.2, minimum=10):
+        self.ratio = ratio
+        self.maximum = minimum
+        self.tokens = minimum
+        self.lock = Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.tokens + self.ratio, self.maximum)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class RetryStats:
+
+    def __init__(self):
+        self.commits = 0
+        self.retries = 0
+        self.failures = 0
+        self.wasted_seconds = 0.0
+        self.backoff_seconds = 0.0
+        self.lock = Lock()
+
+    def add(self, **values):
+        with self.lock:
+            for name, value in values.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def retries_per_commit(self):
+        return self.retries / self.commits if self.commits else 0.0
+
+    def as_dict(self):
+        return {
+            "commits": self.commits,
+            "retries": self.retries,
+            "failures": self.failures,
+            "retries_per_commit": self.retries_per_commit,
+            "wasted_seconds": self.wasted_seconds,
+            "backoff_seconds": self.backoff_seconds,
+        }
+
+
+class TransactionRunner:
+
+    def __init__(self, max_attempts=10, base_delay=0.001, max_delay=0.1, budget=None, retryable=RETRYABLE_ERRORS, pipeline=False):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.retryable = retryable
+        self.pipeline = pipeline
+        self.stats = RetryStats()
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def run(self, conn, transaction, *args):
+        if self.budget is not None:
+            self.budget.deposit()
+        for attempt in range(self.max_attempts):
+            started = time.perf_counter()
+            try:
+                with pipeline_transaction(conn) if self.pipeline else conn.transaction():
+                    result = transaction(conn, *args)
+            except self.retryable:
+                self.stats.add(wasted_seconds=time.perf_counter() - started)
+                if attempt + 1 == self.max_attempts or (self.budget is not None and not self.budget.withdraw()):
+                    self.stats.add(failures=1)
+                    raise
+                delay = self.backoff(attempt)
+                time.sleep(delay)
+                self.stats.add(retries=1, backoff_seconds=delay)
+                continue
+            self.stats.add(commits=1)
+            return result
@@ -0,0 +1,301 @@
+from math import factorial
+import asyncio
+import re
+import time
+
+import psycopg
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+
+from scheduler import ScheduleTimeout
+
+LOCKING_READ = re.compile(r"\bFOR\s+(UPDATE|NO\s+KEY\s+UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+INSERT_ROW = "INSERT INTO employee (id, name, salary) VALUES (%s, %s, %s)"
+
+
+def is_read(statement):
+    return statement.lstrip().upper().startswith("SELECT") and not LOCKING_READ.search(statement)
+
+
+def conflicts(statement, other):
+    return not (is_read(statement) and is_read(other))
+
+
+class Scenario:
+
+    def __init__(self, name, isolation_level, rows, transactions, final, invariant, anomaly=False):
+        self.name = name
+        self.isolation_level = isolation_level
+        self.rows = rows
+        self.transactions = {}
+        for transaction, statements in transactions.items():
+            statements = list(statements)
+            if not statements or statements[-1].upper() not in ("COMMIT", "ROLLBACK"):
+                statements.append("COMMIT")
+            self.transactions[transaction] = statements
+        self.final = final
+        self.invariant = invariant
+        self.anomaly = anomaly
+
+    def statement(self, step):
+        transaction, index = step
+        return self.transactions[transaction][index]
+
+    def interleavings(self):
+        total = factorial(sum(len(statements) for statements in self.transactions.values()))
+        for statements in self.transactions.values():
+            total //= factorial(len(statements))
+        return total
+
+
+def label(step):
+    transaction, index = step
+    return f"{transaction}.{index + 1}"
+
+
+def trace_key(scenario, executed, dispatched, statuses):
+    completed = frozenset(
+        (earlier, later)
+        for position, later in enumerate(executed)
+        for earlier in executed[:position]
+        if earlier[0] != later[0] and conflicts(scenario.statement(earlier), scenario.statement(later))
+    )
+    waiting = frozenset((step, frozenset(before)) for step, before in dispatched.items())
+    return frozenset(executed), completed, waiting, tuple(sorted(statuses.items()))
+
+
+class Outcome:
+
+    def __init__(self, choices, executed, statuses, values, final):
+        self.choices = choices
+        self.executed = executed
+        self.statuses = statuses
+        self.values = values
+        self.final = final
+        self.held = True
+
+    @property
+    def committed(self):
+        return {name for name, status in self.statuses.items() if status == "committed"}
+
+    def describe(self):
+        statuses = ", ".join(f"{name} {status}" for name, status in self.statuses.items())
+        return f"{' '.join(label(step) for step in self.executed)} -> {statuses}"
+
+
+class Worker:
+
+    def __init__(self, conninfo, schema, scenario, block_poll=0.002, timeout=10):
+        self.conninfo = conninfo
+        self.schema = schema
+        self.scenario = scenario
+        self.block_poll = block_poll
+        self.timeout = timeout
+        self.admin = None
+        self.connections = {}
+
+    async def __aenter__(self):
+        self.admin = await psycopg.AsyncConnection.connect(self.conninfo, autocommit=True)
+        schema = sql.Identifier(self.schema)
+        await self.admin.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(schema))
+        await self.admin.execute(sql.SQL("CREATE SCHEMA {}").format(schema))
+        await self.admin.execute(sql.SQL("CREATE TABLE {}.employee (LIKE public.employee INCLUDING INDEXES)").format(schema))
+        await self.admin.execute(sql.SQL("SET search_path = {}").format(schema))
+        options = f"-c search_path={self.schema} -c deadlock_timeout=50ms -c synchronous_commit=off"
+        for name in self.scenario.transactions:
+            conn = await psycopg.AsyncConnection.connect(make_conninfo(self.conninfo, options=options))
+            await conn.set_isolation_level(self.scenario.isolation_level)
+            self.connections[name] = conn
+        return self
+
+    async def __aexit__(self, *exc_info):
+        for conn in self.connections.values():
+            await conn.close()
+        await self.admin.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(self.schema)))
+        await self.admin.close()
+
+    async def is_blocked(self, name):
+        pid = self.connections[name].info.backend_pid
+        others = [conn.info.backend_pid for other, conn in self.connections.items() if other != name]
+        cur = await self.admin.execute("SELECT pg_isolation_test_session_is_blocked(%s, %s)", (pid, others))
+        blocked, = await cur.fetchone()
+        return blocked
+
+    async def settle(self, name, task):
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=self.block_poll)
+            if done:
+                return True
+            if await self.is_blocked(name):
+                return False
+
+    async def execute(self, name, statement, values):
+        conn = self.connections[name]
+        if statement.upper() == "COMMIT":
+            await conn.commit()
+            return
+        if statement.upper() == "ROLLBACK":
+            await conn.rollback()
+            return
+        async with conn.cursor() as cur:
+            await cur.execute(statement, values if "%(" in statement else None)
+            if cur.description is not None:
+                row = await cur.fetchone()
+                if row is not None:
+                    values.update(zip([column.name for column in cur.description], row))
+
+    async def abandon(self, pending):
+        for name, conn in self.connections.items():
+            if name not in pending:
+                await conn.rollback()
+        for name, (_, task) in pending.items():
+            await asyncio.gather(task, return_exceptions=True)
+            await self.connections[name].rollback()
+
+    async def run(self, prefix, visit):
+        await self.admin.execute("DELETE FROM employee")
+        async with self.admin.cursor() as cur:
+            await cur.executemany(INSERT_ROW, self.scenario.rows)
+
+        names = list(self.scenario.transactions)
+        positions = {name: 0 for name in names}
+        statuses = {name: "running" for name in names}
+        values = {name: {} for name in names}
+        pending = {}
+        dispatched = {}
+        executed = []
+        choices = []
+
+        async def collect(name):
+            step, task = pending.pop(name)
+            del dispatched[step]
+            executed.append(step)
+            error = task.exception()
+            if error is None:
+                statement = self.scenario.statement(step).upper()
+                if statement in ("COMMIT", "ROLLBACK"):
+                    statuses[name] = "committed" if statement == "COMMIT" else "rolled back"
+                return
+            if not isinstance(error, psycopg.Error):
+                raise error
+            statuses[name] = f"aborted ({type(error).__name__})"
+            await self.connections[name].rollback()
+
+        async def settle_pending():
+            for name, (_, task) in list(pending.items()):
+                if await self.settle(name, task):
+                    await collect(name)
+
+        while True:
+            runnable = [name for name in names if name not in pending and statuses[name] == "running"]
+            if not runnable:
+                if not pending:
+                    break
+                done, _ = await asyncio.wait([task for _, task in pending.values()], timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise ScheduleTimeout(f"{self.scenario.name}: {' '.join(choices)} stuck with {sorted(pending)} blocked")
+                await settle_pending()
+                continue
+
+            key = trace_key(self.scenario, executed, dispatched, statuses)
+            forced = len(choices) < len(prefix) and prefix[len(choices)] in runnable
+            choice = prefix[len(choices)] if forced else runnable[0]
+            if not visit(tuple(choices), key, runnable, choice) and not forced:
+                await self.abandon(pending)
+                return None
+            choices.append(choice)
+
+            step = choice, positions[choice]
+            positions[choice] += 1
+            dispatched[step] = [earlier for earlier in executed if conflicts(self.scenario.statement(earlier), self.scenario.statement(step))]
+            task = asyncio.ensure_future(self.execute(choice, self.scenario.statement(step), values[choice]))
+            pending[choice] = step, task
+            if await self.settle(choice, task):
+                await collect(choice)
+            await settle_pending()
+
+        cur = await self.admin.execute(self.scenario.final)
+        outcome = Outcome(tuple(choices), executed, statuses, values, await cur.fetchall())
+        outcome.held = bool(self.scenario.invariant(outcome))
+        return outcome
+
+
+class Exploration:
+
+    def __init__(self, scenario, runs, states, outcomes, seconds):
+        self.scenario = scenario
+        self.runs = runs
+        self.states = states
+        self.outcomes = outcomes
+        self.seconds = seconds
+
+    @property
+    def violations(self):
+        return [outcome for outcome in self.outcomes if not outcome.held]
+
+    @property
+    def distinct(self):
+        return len({tuple(outcome.executed) for outcome in self.outcomes})
+
+    @property
+    def passed(self):
+        return bool(self.violations) == self.scenario.anomaly
+
+    def summary(self):
+        return {
+            "scenario": self.scenario.name,
+            "interleavings": self.scenario.interleavings(),
+            "runs": self.runs,
+            "states": self.states,
+            "schedules": len(self.outcomes),
+            "distinct": self.distinct,
+            "violations": len(self.violations),
+            "expected": "violated" if self.scenario.anomaly else "holds",
+            "passed": self.passed,
+            "seconds": self.seconds,
+        }
+
+
+async def explore_async(conninfo, scenario, workers=8):
+    started = time.perf_counter()
+    prefixes = asyncio.Queue()
+    prefixes.put_nowait(())
+    seen = set()
+    outcomes = []
+    runs = 0
+
+    def visit(choices, key, runnable, choice):
+        if key in seen:
+            return False
+        seen.add(key)
+        for alternative in runnable:
+            if alternative != choice:
+                prefixes.put_nowait(choices + (alternative,))
+        return True
+
+    async def work(number):
+        nonlocal runs
+        async with Worker(conninfo, f"explore_{number}", scenario) as worker:
+            while True:
+                prefix = await prefixes.get()
+                try:
+                    if prefix is None:
+                        return
+                    runs += 1
+                    outcome = await worker.run(prefix, visit)
+                    if outcome is not None:
+                        outcomes.append(outcome)
+                finally:
+                    prefixes.task_done()
+
+    async def finish():
+        await prefixes.join()
+        for _ in range(workers):
+            prefixes.put_nowait(None)
+
+    await asyncio.gather(finish(), *(work(number) for number in range(workers)))
+    return Exploration(scenario, runs, len(seen), outcomes, time.perf_counter() - started)
+
+
+def explore(conninfo, scenario, workers=8):
+    return asyncio.run(explore_async(conninfo, scenario, workers))
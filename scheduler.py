@@ -0,0 +1,113 @@
+from contextlib import asynccontextmanager, contextmanager
+from threading import Condition, Thread, current_thread
+import asyncio
+
+
+class ScheduleTimeout(Exception):
+    pass
+
+
+class TransactionScheduler:
+
+    def __init__(self, schedule, timeout=10):
+        self.schedule = list(schedule)
+        self.timeout = timeout
+        self.position = 0
+        self.finished = set()
+        self.condition = Condition()
+
+    def _skip_finished(self):
+        while self.position < len(self.schedule) and self.schedule[self.position] in self.finished:
+            self.position += 1
+
+    def _finish(self, name):
+        with self.condition:
+            self.finished.add(name)
+            self._skip_finished()
+            self.condition.notify_all()
+
+    @contextmanager
+    def step(self):
+        name = current_thread().name
+        with self.condition:
+            is_turn = lambda: self.position < len(self.schedule) and self.schedule[self.position] == name
+            if not self.condition.wait_for(is_turn, self.timeout):
+                raise ScheduleTimeout(f"{name} waited too long for step {self.position} of {self.schedule}")
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.position += 1
+                self._skip_finished()
+                self.condition.notify_all()
+
+    def run(self, **transactions):
+        results = {}
+        errors = {}
+
+        def target(name, transaction):
+            try:
+                results[name] = transaction()
+            except Exception as error:
+                errors[name] = error
+            finally:
+                self._finish(name)
+
+        threads = [Thread(target=target, name=name, args=(name, transaction)) for name, transaction in transactions.items()]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+
+
+class AsyncTransactionScheduler:
+
+    def __init__(self, schedule, timeout=10):
+        self.schedule = list(schedule)
+        self.timeout = timeout
+        self.position = 0
+        self.finished = set()
+        self.condition = asyncio.Condition()
+
+    def _skip_finished(self):
+        while self.position < len(self.schedule) and self.schedule[self.position] in self.finished:
+            self.position += 1
+
+    async def _finish(self, name):
+        async with self.condition:
+            self.finished.add(name)
+            self._skip_finished()
+            self.condition.notify_all()
+
+    @asynccontextmanager
+    async def step(self):
+        name = asyncio.current_task().get_name()
+        async with self.condition:
+            is_turn = lambda: self.position < len(self.schedule) and self.schedule[self.position] == name
+            try:
+                await asyncio.wait_for(self.condition.wait_for(is_turn), self.timeout)
+            except asyncio.TimeoutError:
+                raise ScheduleTimeout(f"{name} waited too long for step {self.position} of {self.schedule}") from None
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.position += 1
+                self._skip_finished()
+                self.condition.notify_all()
+
+    async def run(self, **transactions):
+        results = {}
+        errors = {}
+
+        async def target(name, transaction):
+            try:
+                results[name] = await transaction()
+            except Exception as error:
+                errors[name] = error
+            finally:
+                await self._finish(name)
+
+        await asyncio.gather(*(asyncio.create_task(target(name, transaction), name=name) for name, transaction in transactions.items()))
+        return results, errors
@@ -0,0 +1,195 @@
+from collections import deque
+
+WW = "ww"
+WR = "wr"
+RW = "rw"
+
+
+class Transaction:
+
+    def __init__(self, id, process, status, ops):
+        self.id = id
+        self.process = process
+        self.status = status
+        self.ops = ops
+
+    def as_dict(self):
+        return {"id": self.id, "process": self.process, "status": self.status, "ops": self.ops}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["id"], data["process"], data["status"], [list(op) for op in data["ops"]])
+
+
+class VersionIndex:
+
+    def __init__(self, transactions):
+        self.writer = {}
+        self.overwriter = {}
+        self.final = {}
+        for transaction in transactions:
+            for f, key, value, *previous in transaction.ops:
+                if f != "w":
+                    continue
+                self.writer[key, value] = transaction
+                self.final[transaction.id, key] = value
+                if transaction.status == "ok":
+                    self.overwriter.setdefault((key, previous[0]), transaction)
+
+
+def dependency_graph(transactions, index):
+    graph = {}
+    for transaction in transactions:
+        if transaction.status != "ok":
+            continue
+        edges = graph.setdefault(transaction.id, {})
+        for f, key, value, *previous in transaction.ops:
+            if f == "r":
+                writer = index.writer.get((key, value))
+                if writer is not None and writer.id != transaction.id and writer.status == "ok":
+                    graph.setdefault(writer.id, {}).setdefault(transaction.id, set()).add(WR)
+                overwriter = index.overwriter.get((key, value))
+                if overwriter is not None and overwriter.id != transaction.id:
+                    edges.setdefault(overwriter.id, set()).add(RW)
+            else:
+                writer = index.writer.get((key, previous[0]))
+                if writer is not None and writer.id != transaction.id and writer.status == "ok":
+                    graph.setdefault(writer.id, {}).setdefault(transaction.id, set()).add(WW)
+    return graph
+
+
+def restrict(graph, kinds):
+    return {node: [target for target, edge_kinds in edges.items() if edge_kinds & kinds] for node, edges in graph.items()}
+
+
+def strongly_connected_components(adjacency):
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for root in adjacency:
+        if root in index:
+            continue
+        work = [(root, iter(adjacency.get(root, ())))]
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, targets = work[-1]
+            for target in targets:
+                if target not in index:
+                    index[target] = lowlink[target] = counter
+                    counter += 1
+                    stack.append(target)
+                    on_stack.add(target)
+                    work.append((target, iter(adjacency.get(target, ()))))
+                    break
+                if target in on_stack:
+                    lowlink[node] = min(lowlink[node], index[target])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    if len(component) > 1:
+                        components.append(component)
+    return components
+
+
+def find_path(adjacency, start, goal, members):
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node == goal:
+            path = []
+            while node is not None:
+                path.append(node)
+                node = parents[node]
+            return path[::-1]
+        for target in adjacency.get(node, ()):
+            if target in members and target not in parents:
+                parents[target] = node
+                queue.append(target)
+    return None
+
+
+def witness(adjacency, component):
+    members = set(component)
+    start = component[0]
+    for target in adjacency.get(start, ()):
+        if target in members:
+            return [start] + find_path(adjacency, target, start, members)
+
+
+def single_rw_witness(graph, component, adjacency_without_rw):
+    members = set(component)
+    for node in component:
+        for target, kinds in graph[node].items():
+            if RW in kinds and target in members:
+                path = find_path(adjacency_without_rw, target, node, members)
+                if path is not None:
+                    return [node] + path
+    return None
+
+
+def check(transactions, max_witnesses=5):
+    transactions = list(transactions)
+    index = VersionIndex(transactions)
+    anomalies = {"G0": [], "G1a": [], "G1b": [], "G1c": [], "G-single": [], "G2": []}
+
+    for transaction in transactions:
+        if transaction.status != "ok":
+            continue
+        for f, key, value, *previous in transaction.ops:
+            if f != "r":
+                continue
+            writer = index.writer.get((key, value))
+            if writer is None or writer.id == transaction.id:
+                continue
+            if writer.status == "fail":
+                anomalies["G1a"].append({"reader": transaction.id, "writer": writer.id, "key": key, "value": value})
+            elif index.final[writer.id, key] != value:
+                anomalies["G1b"].append({"reader": transaction.id, "writer": writer.id, "key": key, "value": value})
+
+    graph = dependency_graph(transactions, index)
+    write_adjacency = restrict(graph, {WW})
+    without_rw_adjacency = restrict(graph, {WW, WR})
+    full_adjacency = restrict(graph, {WW, WR, RW})
+
+    for component in strongly_connected_components(write_adjacency):
+        anomalies["G0"].append(witness(write_adjacency, component))
+
+    g0_members = {node for cycle in anomalies["G0"] for node in cycle}
+    for component in strongly_connected_components(without_rw_adjacency):
+        if not g0_members.issuperset(component):
+            anomalies["G1c"].append(witness(without_rw_adjacency, component))
+
+    g1_members = g0_members | {node for cycle in anomalies["G1c"] for node in cycle}
+    for component in strongly_connected_components(full_adjacency):
+        if g1_members.issuperset(component):
+            continue
+        cycle = single_rw_witness(graph, component, without_rw_adjacency)
+        if cycle is not None:
+            anomalies["G-single"].append(cycle)
+        else:
+            anomalies["G2"].append(witness(full_adjacency, component))
+
+    return {
+        "transactions": len(transactions),
+        "operations": sum(len(transaction.ops) for transaction in transactions),
+        "edges": sum(len(targets) for targets in full_adjacency.values()),
+        "counts": {name: len(found) for name, found in anomalies.items()},
+        "witnesses": {name: found[:max_witnesses] for name, found in anomalies.items() if found},
+    }
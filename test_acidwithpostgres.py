@@ -1,133 +1,249 @@
-from threading import Thread
 import datetime
-import unittest
+import itertools
 import time
 
-from testcontainers.postgres import PostgresContainer
 import psycopg
 
-class AcidWithPostgresTestCase(unittest.TestCase):
-    
-    @classmethod
-    def setUpClass(cls):
-        cls.postgres = PostgresContainer("postgres:16.2-alpine")
-        cls.postgres.start()
-        
-        with psycopg.connect(cls.connection_uri()) as conn:
-            with conn.cursor() as cur:
-                cur.execute("CREATE TABLE employee (id serial PRIMARY KEY, name text, salary double precision)")
+from backends import PostgresBackend
+from benchmark_savepoints import SUBXACT_CACHE, subxact_state
+from bulk_load import generate_employees, load_copy, scale_rows
+from crash_recovery import redo_seconds, wait_until_ready
+from postgres_session import PostgresTestCase, requires_container, session
+from scheduler import TransactionScheduler
+from verification import compare_stream, table_totals
 
-    @classmethod
-    def tearDownClass(cls):
-        cls.postgres.stop()
-    
-    @classmethod
-    def connection_uri(cls):
-        return cls.postgres.get_connection_url().replace("+psycopg2", "")
-    
-    def tearDown(self):
-        with psycopg.connect(self.connection_uri()) as conn:
-            with conn.cursor() as cur:
-                cur.execute("DELETE FROM employee")
+class AcidTests:
+
+    def employees(self):
+        conn = self.backend.connect()
+        try:
+            rows = conn.execute("SELECT name, salary FROM employee ORDER BY id").fetchall()
+            conn.commit()
+        finally:
+            conn.close()
+        return [tuple(row) for row in rows]
+
+    def insert(self, conn, name, salary):
+        conn.execute(self.backend.prepare("INSERT INTO employee (name, salary) VALUES (%s, %s)"), (name, salary))
 
     def test_atomicity(self):
-        with psycopg.connect(self.connection_uri()) as conn:
+        conn = self.backend.connect()
+        try:
+            with self.backend.transaction(conn):
+                self.insert(conn, "John Smith", 2500)
+            with self.assertRaises(RuntimeError):
+                with self.backend.transaction(conn):
+                    self.insert(conn, "Beth Lee", 3500)
+                    raise RuntimeError
+        finally:
+            conn.close()
+
+        self.assertEqual(self.employees(), [("John Smith", 2500)])
+
+    def test_consistency(self):
+        conn = self.backend.connect()
+        try:
+            with self.backend.transaction(conn):
+                self.insert(conn, "Dep Tunner", 3000)
+            with self.assertRaises(Exception) as single:
+                with self.backend.transaction(conn):
+                    self.insert(conn, "Mary Castle", "2024-12-20")
+            with self.assertRaises(Exception) as multiple:
+                with self.backend.transaction(conn):
+                    self.insert(conn, "Bob Fox", 2750)
+                    self.insert(conn, "Alan Rock", "2024-12-20")
+        finally:
+            conn.close()
+
+        self.assertEqual(self.backend.classify(single.exception), "constraint")
+        self.assertEqual(self.backend.classify(multiple.exception), "constraint")
+        self.assertEqual(self.employees(), [("Dep Tunner", 3000)])
+
+class AcidWithPostgresTestCase(AcidTests, PostgresTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.backend = PostgresBackend(self.connection_uri())
+
+    def test_atomicity_with_savepoints(self):
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("John Smith", 2500))
+                with self.assertRaises(RuntimeError):
+                    with conn.transaction():
+                        conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Beth Lee", 3500))
+                        raise RuntimeError
+                with conn.transaction():
+                    conn.execute("UPDATE employee SET salary = salary + 100 WHERE name = %s", ("John Smith",))
+                    with self.assertRaises(psycopg.errors.DatatypeMismatch):
+                        with conn.transaction():
+                            conn.execute("UPDATE employee SET salary = salary + 100 WHERE name = %s", ("John Smith",))
+                            conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Mary Castle", datetime.date(2024, 12, 20)))
+                    conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Dep Tunner", 3000))
+
+        with self.pool.connection() as conn:
+            report = compare_stream(conn, "SELECT name, salary FROM employee ORDER BY id", [("John Smith", 2600), ("Dep Tunner", 3000)])
+
+        self.assertEqual(report.mismatches, 0, report.samples)
+
+    def test_released_savepoints_roll_back_with_their_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with self.pool.connection() as conn:
+                with conn.transaction():
+                    with conn.transaction():
+                        conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Bob Fox", 2750))
+                    raise RuntimeError
+
+        with self.pool.connection() as conn:
+            count, total = table_totals(conn)
+
+        self.assertEqual(count, 0)
+
+    def test_atomicity_past_the_subxact_cache(self):
+        with self.pool.connection() as conn:
+            with conn.transaction():
+                for number in range(200):
+                    try:
+                        with conn.transaction():
+                            conn.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", (f"Paul Port {number}", number))
+                            if number % 2:
+                                raise RuntimeError
+                    except RuntimeError:
+                        pass
+                cached, overflowed = subxact_state(conn)
+
+        with self.pool.connection() as conn:
+            report = compare_stream(conn, "SELECT salary FROM employee ORDER BY id", [(number,) for number in range(0, 200, 2)])
+
+        self.assertEqual(cached, SUBXACT_CACHE)
+        self.assertTrue(overflowed)
+        self.assertEqual(report.mismatches, 0, report.samples)
+
+    def test_atomicity_at_scale(self):
+        rows = scale_rows()
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("John Smith", 2500))
-        
-        with self.assertRaises(Exception):
-            with psycopg.connect(self.connection_uri()) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Beth Lee", 3500))
-                    raise RuntimeError
-        
-        with psycopg.connect(self.connection_uri()) as conn:
+
+        with self.pool.connection() as conn:
+            load_copy(conn, generate_employees(rows))
+            started = time.perf_counter()
+            conn.rollback()
+            session.record_timing(f"rollback of {rows} inserted rows", time.perf_counter() - started)
+
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
+                cur.execute("SELECT count(*) FROM employee")
+                count, = cur.fetchone()
                 cur.execute("SELECT name, salary FROM employee")
-                db_data = cur.fetchall()
-        
-        self.assertEqual(len(db_data), 1)
-        self.assertEqual(db_data[0], ("John Smith", 2500))
-    
-    def test_consistency(self):
-        with psycopg.connect(self.connection_uri()) as conn:
+                db_data = cur.fetchone()
+
+        self.assertEqual(count, 1)
+        self.assertEqual(db_data, ("John Smith", 2500))
+
+    def test_consistency_at_scale(self):
+        rows = scale_rows()
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Dep Tunner", 3000))
-        
-        with self.assertRaises(Exception):
-            with psycopg.connect(self.connection_uri()) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Mary Castle", datetime.date(2024, 12, 20)))
-    
-        with self.assertRaises(Exception):
-            with psycopg.connect(self.connection_uri()) as conn:
-                with conn.cursor() as cur:
-                    cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Bob Fox", 2750))
-                    cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Alan Rock", datetime.date(2024, 12, 20)))
-        
-        with psycopg.connect(self.connection_uri()) as conn:
+
+        with self.assertRaises(psycopg.errors.InvalidTextRepresentation):
+            with self.pool.connection() as conn:
+                load_copy(conn, itertools.chain(generate_employees(rows), [("Alan Rock", datetime.date(2024, 12, 20))]))
+
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
-                cur.execute("SELECT name, salary FROM employee")
-                db_data = cur.fetchall()
-        
-        self.assertEqual(len(db_data), 1)
-        self.assertEqual(db_data[0], ("Dep Tunner", 3000))
-        
+                cur.execute("SELECT count(*) FROM employee")
+                count, = cur.fetchone()
+
+        self.assertEqual(count, 1)
+
+    def test_streaming_verification_at_scale(self):
+        rows = scale_rows()
+        with self.pool.connection() as conn:
+            load_copy(conn, generate_employees(rows))
+
+        with self.pool.connection() as conn:
+            count, total = table_totals(conn)
+            report = compare_stream(conn, "SELECT name, salary FROM employee ORDER BY id", generate_employees(rows))
+        session.record_timing(f"streamed verification of {rows} rows ({report.rows_per_second:.0f} rows/s, peak RSS {report.peak_rss_kb / 1024:.0f}MB, +{report.rss_growth_kb / 1024:.1f}MB)", report.seconds)
+
+        self.assertEqual(count, rows)
+        self.assertEqual(total, sum(salary for _, salary in generate_employees(rows)))
+        self.assertEqual(report.rows, rows)
+        self.assertEqual(report.mismatches, 0, report.samples)
+        self.assertLess(report.rss_growth_kb, 32 * 1024)
+
     def test_isolation(self):
-        with psycopg.connect(self.connection_uri()) as conn:
+        with self.pool.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Jess Tex", 4000))
 
+        scheduler = TransactionScheduler(["t1", "t2", "t2", "t1", "t1"])
+
         def transaction1():
-            with psycopg.connect(self.connection_uri()) as conn:
+            with self.pool.connection() as conn:
                 with conn.cursor() as cur:
-                    cur.execute("SELECT id, salary FROM employee WHERE name = %s", ("Jess Tex",))
-                    db_data = cur.fetchone()
-                    time.sleep(4)
-                    new_salary = db_data[1] * 1.1
-                    cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (new_salary, db_data[0]))
+                    with scheduler.step():
+                        cur.execute("SELECT id, salary FROM employee WHERE name = %s", ("Jess Tex",))
+                        db_data = cur.fetchone()
+                    with scheduler.step():
+                        new_salary = db_data[1] * 1.1
+                        cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (new_salary, db_data[0]))
+                    with scheduler.step():
+                        conn.commit()
         
         def transaction2():
-            with psycopg.connect(self.connection_uri()) as conn:
+            with self.pool.connection() as conn:
                 with conn.cursor() as cur:
-                    time.sleep(2)
-                    cur.execute("SELECT id, salary FROM employee WHERE name = %s", ("Jess Tex",))
-                    db_data = cur.fetchone()
-                    new_salary = db_data[1] * 1.2
-                    cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (new_salary, db_data[0]))
+                    with scheduler.step():
+                        cur.execute("SELECT id, salary FROM employee WHERE name = %s", ("Jess Tex",))
+                        db_data = cur.fetchone()
+                        new_salary = db_data[1] * 1.2
+                        cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (new_salary, db_data[0]))
+                    with scheduler.step():
+                        conn.commit()
         
-        threads = [Thread(target=transaction1), Thread(target=transaction2)]
-        for thread in threads:
-            thread.start()
-        for thread in threads:
-            thread.join()
+        scheduler.run(t1=transaction1, t2=transaction2)
         
-        with psycopg.connect(self.connection_uri()) as conn:
+        with self.pool.connection() as conn:
                 with conn.cursor() as cur:
                     cur.execute("SELECT salary FROM employee WHERE name = %s", ("Jess Tex",))
                     db_data = cur.fetchone()
         
         self.assertEqual(db_data[0], 4400)
     
+    @requires_container
     def test_durability(self):
-        container = self.postgres.get_wrapped_container()
-        with psycopg.connect(self.connection_uri()) as conn:
-            with conn.cursor() as cur:
-                cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Paul Port", 3000))
+        server = self.session.crash_server()
+        acknowledged = []
+        conn = psycopg.connect(self.connection_uri())
+        with conn.cursor() as cur:
+            for number in range(100):
+                cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", (f"Paul Port {number}", 3000))
+                id_employee, = cur.fetchone()
                 conn.commit()
-                container.stop()
-                container.wait()
+                acknowledged.append(id_employee)
+            cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Beth Lee", 3500))
+        server.crash()
+
+        with self.assertRaises(psycopg.OperationalError):
+            conn.commit()
+        conn.close()
 
         with self.assertRaises(Exception) as cm:
             psycopg.connect(self.connection_uri())
-        
-        container.start()
-        self.postgres._connect()
+
+        started = time.perf_counter()
+        server.restart()
+        wait_until_ready(self.connection_uri)
+        session.record_timing(f"crash recovery (redo {redo_seconds(server.recovery_log()):.3f}s)", time.perf_counter() - started)
 
         with psycopg.connect(self.connection_uri()) as conn:
+            report = compare_stream(conn, "SELECT id FROM employee ORDER BY id", [(id_employee,) for id_employee in acknowledged])
             with conn.cursor() as cur:
-                cur.execute("SELECT name, salary FROM employee")
-                db_data = cur.fetchall()
-        
-        self.assertEqual(len(db_data), 1)
-        self.assertEqual(db_data[0], ("Paul Port", 3000))
+                cur.execute("SELECT count(*) FROM employee WHERE name = %s", ("Beth Lee",))
+                uncommitted, = cur.fetchone()
+
+        self.assertEqual(report.mismatches, 0, report.samples)
+        self.assertEqual(uncommitted, 0)
@@ -0,0 +1,114 @@
+import asyncio
+
+import psycopg
+
+from postgres_session import AsyncPostgresTestCase
+from scheduler import AsyncTransactionScheduler
+
+class AsyncIsolationWithPostgresTestCase(AsyncPostgresTestCase):
+
+    async def test_lost_update_with_read_committed_isolation_level(self):
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", ("Mary Castle", 4000))
+                id_employee, = await cur.fetchone()
+
+        scheduler = AsyncTransactionScheduler(["t1", "t2", "t2", "t1", "t1"])
+
+        async def transaction1():
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    async with scheduler.step():
+                        await cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+                        salary, = await cur.fetchone()
+                    async with scheduler.step():
+                        new_salary = salary * 1.1
+                        await cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (new_salary, id_employee))
+                    async with scheduler.step():
+                        await conn.commit()
+
+        async def transaction2():
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    async with scheduler.step():
+                        await cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+                        salary, = await cur.fetchone()
+                        new_salary = salary * 1.2
+                        await cur.execute("UPDATE employee SET salary=%s WHERE id=%s", (new_salary, id_employee))
+                    async with scheduler.step():
+                        await conn.commit()
+
+        await scheduler.run(t1=transaction1, t2=transaction2)
+
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+                salary, = await cur.fetchone()
+
+        self.assertEqual(salary, 4400)
+
+    async def test_without_write_skew_with_serializable_isolation_level(self):
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", ("Dean Knox", 5000))
+                id_employee1, = await cur.fetchone()
+                await cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", ("Madison Frey", 9000))
+                id_employee2, = await cur.fetchone()
+
+        scheduler = AsyncTransactionScheduler(["t1", "t2", "t2", "t1", "t1"])
+
+        async def transaction1():
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    async with scheduler.step():
+                        await cur.execute("SET TRANSACTION ISOLATION LEVEL SERIALIZABLE")
+                        await cur.execute("SELECT SUM(salary) FROM employee")
+                        total_salary, = await cur.fetchone()
+                        increment_salary = 0.1 * total_salary
+                    async with scheduler.step():
+                        await cur.execute("UPDATE employee SET salary=salary+%s WHERE id=%s", (increment_salary, id_employee1))
+                    async with scheduler.step():
+                        await conn.commit()
+
+        async def transaction2():
+            async with self.pool.connection() as conn:
+                async with conn.cursor() as cur:
+                    async with scheduler.step():
+                        await cur.execute("SET TRANSACTION ISOLATION LEVEL SERIALIZABLE")
+                        await cur.execute("SELECT SUM(salary) FROM employee")
+                        total_salary, = await cur.fetchone()
+                        increment_salary = 0.1 * total_salary
+                        await cur.execute("UPDATE employee SET salary=salary+%s WHERE id=%s", (increment_salary, id_employee2))
+                    async with scheduler.step():
+                        await conn.commit()
+
+        results, errors = await scheduler.run(t1=transaction1, t2=transaction2)
+
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee1,))
+                new_salary_employee1, = await cur.fetchone()
+                await cur.execute("SELECT salary FROM employee WHERE id = %s", (id_employee2,))
+                new_salary_employee2, = await cur.fetchone()
+
+        self.assertEqual(type(errors["t1"]), psycopg.errors.SerializationFailure)
+        self.assertEqual(new_salary_employee1, 5000)
+        self.assertEqual(new_salary_employee2, 10400)
+
+    async def test_thousands_of_concurrent_transactions(self):
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", ("Jess Tex", 0))
+                id_employee, = await cur.fetchone()
+
+        async def transaction():
+            async with self.pool.connection() as conn:
+                await conn.execute("UPDATE employee SET salary=salary+1 WHERE id=%s", (id_employee,))
+
+        await asyncio.gather(*(transaction() for _ in range(2000)))
+
+        async with self.pool.connection() as conn:
+            cur = await conn.execute("SELECT salary FROM employee WHERE id = %s", (id_employee,))
+            salary, = await cur.fetchone()
+
+        self.assertEqual(salary, 2000)
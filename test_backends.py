@@ -0,0 +1,56 @@
+import tempfile
+import unittest
+
+from psycopg import IsolationLevel
+
+from backends import PostgresBackend, SqliteBackend, reset, sqlite_path
+from benchmark_engines import commit_latency, concurrent_writers
+from isolation_scenarios import SCENARIOS, lost_update, write_skew
+from postgres_session import PostgresTestCase
+from test_acidwithpostgres import AcidTests
+
+class BackendAcidTests:
+
+    def test_serializable_scenarios_have_no_anomalies(self):
+        for scenario in (lost_update(IsolationLevel.REPEATABLE_READ), write_skew(IsolationLevel.SERIALIZABLE)):
+            with self.subTest(scenario=scenario.name):
+                exploration = self.backend.explore(scenario)
+
+                self.assertTrue(exploration.outcomes)
+                self.assertEqual(exploration.violations, [])
+
+    def test_concurrent_writers_lose_nothing(self):
+        self.assertGreater(commit_latency(self.backend, 20)["commit_p50_ms"], 0)
+
+        result = concurrent_writers(self.backend, 4, 0.3, 4, "serializable")
+
+        self.assertGreater(result["tps"], 0)
+        self.assertEqual(result["lost"], 0)
+
+class SqliteBackendTests(AcidTests, BackendAcidTests):
+    journal_mode = None
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.backend = SqliteBackend(sqlite_path(directory.name, self.journal_mode), self.journal_mode)
+
+    def test_declared_scenarios_never_show_anomalies(self):
+        for scenario in SCENARIOS:
+            if len(scenario.transactions) > 2:
+                continue
+            with self.subTest(scenario=scenario.name):
+                self.assertEqual(self.backend.explore(scenario).violations, [])
+
+class SqliteWalTestCase(SqliteBackendTests, unittest.TestCase):
+    journal_mode = "wal"
+
+class SqliteRollbackJournalTestCase(SqliteBackendTests, unittest.TestCase):
+    journal_mode = "delete"
+
+class PostgresBackendTestCase(BackendAcidTests, PostgresTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.backend = PostgresBackend(self.connection_uri())
+        reset(self.backend, [])
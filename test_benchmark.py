@@ -0,0 +1,180 @@
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from benchmark import percentile
+from benchmark_pipeline import run_benchmark as run_pipeline_benchmark
+from benchmark_scale import run_benchmark as run_scale_benchmark
+from load_generator import Histogram, bucket, bucket_bounds, run_processes
+from benchmark_snapshot import run_benchmark as run_snapshot_benchmark, summarize_phases
+from benchmark_savepoints import run_benchmark as run_savepoint_benchmark
+from benchmark_regression import cases, compare, main as regression_main, run_cases
+from benchmark_commit import run_benchmark as run_commit_benchmark
+from benchmark_recovery import batch_ranges
+from benchmark_hot_row import STRATEGIES, run_benchmark as run_hot_row_benchmark
+from benchmark_isolation import run_benchmark
+from postgres_session import PostgresTestCase, requires_container
+
+class PercentileTestCase(unittest.TestCase):
+
+    def test_nearest_rank(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(percentile(values, 0.50), 50)
+        self.assertEqual(percentile(values, 0.99), 99)
+        self.assertEqual(percentile([7], 0.99), 7)
+        self.assertEqual(percentile([], 0.99), 0.0)
+
+class HistogramTestCase(unittest.TestCase):
+
+    def test_buckets_keep_three_percent_precision(self):
+        for microseconds in [0, 1, 31, 63, 64, 1000, 123456, 10 ** 9]:
+            low, high = bucket_bounds(bucket(microseconds))
+
+            self.assertLessEqual(low, microseconds)
+            self.assertLess(microseconds, high)
+            self.assertLessEqual(high - low, max(low / 32, 1))
+
+    def test_merged_percentiles(self):
+        first, second = Histogram(), Histogram()
+        for number in range(1, 501):
+            first.record(number / 1000)
+            second.record((number + 500) / 1000)
+
+        merged = Histogram().merge(first).merge(second)
+
+        self.assertEqual(merged.total, 1000)
+        self.assertAlmostEqual(merged.percentile(0.50), percentile([number / 1000 for number in range(1, 1001)], 0.50), delta=0.5 / 32)
+        self.assertAlmostEqual(merged.percentile(0.99), 0.99, delta=0.99 / 32)
+
+class RecoveryBatchTestCase(unittest.TestCase):
+
+    def test_consecutive_batches_cover_different_rows(self):
+        ranges = batch_ranges(100, 30)
+
+        self.assertEqual([next(ranges) for _ in range(5)], [(1, 30), (31, 60), (61, 90), (91, 120), (1, 30)])
+
+
+class RegressionComparisonTestCase(unittest.TestCase):
+
+    def results(self, samples, higher_is_better=False):
+        return {"cases": {"atomicity": {"unit": "ms/op", "higher_is_better": higher_is_better, "samples": samples}}}
+
+    def test_only_significant_slowdowns_fail(self):
+        baseline = self.results([1.00, 1.02, 0.98, 1.01, 0.99])
+        noisy = self.results([1.03, 0.97, 1.02, 0.99, 1.01])
+        slower = self.results([1.30, 1.28, 1.33, 1.31, 1.29])
+
+        self.assertEqual(compare(baseline, noisy)[0]["verdict"], "same")
+        self.assertEqual(compare(baseline, slower)[0]["verdict"], "slower")
+        self.assertEqual(compare(slower, baseline)[0]["verdict"], "faster")
+        self.assertEqual(compare(self.results([100, 101, 99], True), self.results([70, 71, 69], True))[0]["verdict"], "slower")
+
+    def test_exit_status(self):
+        with tempfile.TemporaryDirectory() as directory, redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            paths = {}
+            for name, samples in (("baseline", [1.0, 1.01, 0.99]), ("same", [1.0, 0.99, 1.01]), ("slower", [1.5, 1.52, 1.49])):
+                paths[name] = os.path.join(directory, f"{name}.json")
+                with open(paths[name], "w") as file:
+                    json.dump(self.results(samples), file)
+
+            self.assertEqual(regression_main(["--results", paths["same"], "--baseline", paths["baseline"]]), 0)
+            self.assertEqual(regression_main(["--results", paths["slower"], "--baseline", paths["baseline"]]), 1)
+            self.assertEqual(regression_main(["--results", paths["slower"], "--baseline", os.path.join(directory, "missing.json")]), 0)
+
+class RegressionSamplingTestCase(PostgresTestCase):
+
+    def test_warmup_is_discarded(self):
+        selected = [cases(operations=20)["atomicity"]]
+
+        results = run_cases({"atomicity": self.connection_uri()}, selected, warmup=1, samples=2)
+
+        self.assertEqual(len(results["atomicity"]["samples"]), 2)
+        self.assertTrue(all(sample > 0 for sample in results["atomicity"]["samples"]))
+
+class LoadGeneratorTestCase(PostgresTestCase):
+
+    def test_processes_share_one_histogram(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.executemany("INSERT INTO employee (name, salary) VALUES (%s, %s)", [(f"Employee {number}", 4000) for number in range(100)])
+
+        run = run_processes(self.connection_uri(), "lost-update", 100, 5, 2, 0.3)
+
+        self.assertEqual(run["processes"], 2)
+        self.assertGreater(run["commits"], 0)
+        self.assertEqual(run["histogram"].total, run["commits"])
+
+class IsolationBenchmarkTestCase(PostgresTestCase):
+
+    def test_serializable_has_no_anomalies(self):
+        results = run_benchmark(self.connection_uri(), ["lost-update", "write-skew"], ["serializable"], [4], 0.2, 2)
+
+        self.assertEqual([result["anomalies"] for result in results], [0, 0])
+        self.assertTrue(all(result["tps"] > 0 for result in results))
+
+class CommitBenchmarkTestCase(PostgresTestCase):
+
+    def test_measures_each_setting(self):
+        results = run_commit_benchmark(self.connection_uri, ["on", "off"], [0], 5, [2], 0.2)
+
+        self.assertEqual([result["synchronous_commit"] for result in results], ["on", "off"])
+        self.assertTrue(all(result["tps"] > 0 for result in results))
+
+    @requires_container
+    def test_synchronous_commit_loses_nothing(self):
+        results = run_commit_benchmark(self.connection_uri, ["on"], [0], 5, [2], 0.2, self.session.crash_server(), crash_after=0.3)
+
+        self.assertGreater(results[0]["acknowledged"], 0)
+        self.assertEqual(results[0]["lost"], 0)
+
+class HotRowBenchmarkTestCase(PostgresTestCase):
+
+    def test_every_strategy_keeps_all_raises(self):
+        results = run_hot_row_benchmark(self.connection_uri(), list(STRATEGIES), [4], 0.3, 1)
+
+        self.assertEqual([result["strategy"] for result in results], ["for-update", "version-cas", "serializable"])
+        self.assertEqual([result["lost"] for result in results], [0, 0, 0])
+        self.assertTrue(all(result["tps"] > 0 for result in results))
+
+class SavepointBenchmarkTestCase(PostgresTestCase):
+
+    def test_subxact_cache_overflows_past_64(self):
+        results = run_savepoint_benchmark(self.connection_uri(), [64, 65], 200, 2, 1, 0.2, repeats=1, base_rows=100)
+
+        self.assertEqual([(result["cached"], result["overflowed"]) for result in results], [(64, False), (64, True)])
+        self.assertTrue(all(result["reader_tps"] > 0 for result in results))
+
+class SnapshotBenchmarkTestCase(PostgresTestCase):
+
+    def test_long_snapshot_blocks_vacuum(self):
+        samples = run_snapshot_benchmark(self.connection_uri(), 100, 2, 1, 0.4, 0.2)
+        phases = {result["phase"]: result for result in summarize_phases(samples)}
+
+        self.assertGreater(phases["snapshot"]["not_removable"], 0)
+        self.assertGreater(samples[-1]["vacuum_removed"], 0)
+        self.assertLessEqual(samples[-1]["not_removable"], 2)
+        self.assertGreater(phases["snapshot"]["table_kb"], phases["baseline"]["table_kb"])
+
+class PipelineBenchmarkTestCase(PostgresTestCase):
+
+    def test_pipeline_saves_round_trips(self):
+        results = run_pipeline_benchmark(self.connection_uri(), ["read-modify-write", "transfer"], ["default", "pipeline-prepared"], [2], 0.2, 10, rtt=0.002, repeats=10)
+
+        self.assertEqual([round(result["round_trips"]) for result in results], [4, 2, 4, 1])
+        self.assertTrue(all(result["tps"] > 0 for result in results))
+
+class ScaleBenchmarkTestCase(PostgresTestCase):
+
+    def test_index_shrinks_predicate_locks(self):
+        plans, conflicts = run_scale_benchmark(self.connection_uri(), 5000, ["primary-key", "covering"], queries=["salary-by-name"], repeats=2, clients=[2], duration=0.2, samples=100)
+        plans = {plan["index"]: plan for plan in plans}
+
+        self.assertEqual(plans["primary-key"]["plan"], "Seq Scan")
+        self.assertEqual(plans["primary-key"]["siread_relation"], 1)
+        self.assertEqual(plans["covering"]["plan"], "Index Only Scan")
+        self.assertEqual(plans["covering"]["siread_relation"], 0)
+        self.assertTrue(all(conflict["tps"] > 0 for conflict in conflicts))
@@ -0,0 +1,37 @@
+from connection_pool import pool_stats
+from postgres_session import PostgresTestCase
+
+class ConnectionPoolTestCase(PostgresTestCase):
+    pool_max_size = 1
+
+    def test_returned_connection_is_reset(self):
+        conn = self.pool.getconn()
+        with conn.cursor() as cur:
+            cur.execute("SET default_transaction_isolation = 'serializable'")
+            cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("John Smith", 2500))
+            conn.commit()
+            cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s)", ("Beth Lee", 3500))
+            first_pid = conn.info.backend_pid
+        self.pool.putconn(conn)
+
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SHOW TRANSACTION ISOLATION LEVEL")
+                transaction_isolation, = cur.fetchone()
+                cur.execute("SELECT name FROM employee")
+                db_data = cur.fetchall()
+                second_pid = conn.info.backend_pid
+
+        self.assertEqual(first_pid, second_pid)
+        self.assertEqual(transaction_isolation, "read committed")
+        self.assertEqual(db_data, [("John Smith",)])
+
+    def test_pool_stats(self):
+        for _ in range(3):
+            with self.pool.connection() as conn:
+                conn.execute("SELECT 1")
+
+        stats = pool_stats(self.pool)
+
+        self.assertEqual(stats["checkouts"], 3)
+        self.assertEqual(stats["connections_created"], 1)
@@ -0,0 +1,55 @@
+import unittest
+
+from benchmark_isolation import seed
+from deadlocks import orderings, run_deadlock
+from postgres_session import PostgresTestCase
+
+class OrderingTestCase(unittest.TestCase):
+
+    def test_every_ordering_is_one_cycle(self):
+        for transactions in (2, 3, 8):
+            for name, locks in orderings(transactions).items():
+                with self.subTest(transactions=transactions, ordering=name):
+                    waits_for = {first: second for first, second in locks}
+                    row, visited = locks[0][0], set()
+                    while row not in visited:
+                        visited.add(row)
+                        row = waits_for[row]
+
+                    self.assertEqual(len(visited), transactions)
+
+class DeadlockTestCase(PostgresTestCase):
+
+    def salaries(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, salary FROM employee ORDER BY id")
+                return dict(cur.fetchall())
+
+    def test_exactly_one_victim(self):
+        for transactions in (2, 3, 5):
+            for name, locks in orderings(transactions).items():
+                with self.subTest(transactions=transactions, ordering=name):
+                    with self.pool.connection() as conn:
+                        seed(conn, transactions, [3000])
+
+                    outcome = run_deadlock(self.connection_uri(), locks, "20ms")
+
+                    victim, = outcome.victims
+                    expected = {row: 3000 for row in range(1, transactions + 1)}
+                    for number in outcome.committed:
+                        for row in locks[number]:
+                            expected[row] += 1
+                    self.assertEqual(len(outcome.committed), transactions - 1)
+                    self.assertEqual(self.salaries(), expected)
+
+    def test_detection_waits_for_deadlock_timeout(self):
+        with self.pool.connection() as conn:
+            seed(conn, 4, [3000])
+
+        outcome = run_deadlock(self.connection_uri(), orderings(4)["shuffled"], "200ms", bystanders=3)
+
+        self.assertEqual(len(outcome.victims), 1)
+        self.assertEqual(len(outcome.committed), 6)
+        self.assertGreaterEqual(outcome.victim_wait_seconds, 0.19)
+        self.assertLess(outcome.detection_seconds, 1.0)
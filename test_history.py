@@ -0,0 +1,144 @@
+import os
+import tempfile
+import time
+import unittest
+
+import psycopg
+
+from history import HistoryRecorder, load, read_salary, record_workload, serial_history, write_salary
+from postgres_session import PostgresTestCase
+from scheduler import TransactionScheduler
+from serializability import Transaction, check
+
+class SerializabilityCheckerTestCase(unittest.TestCase):
+
+    def test_serial_history_at_scale_has_no_anomalies(self):
+        transactions = serial_history(100000, 50)
+
+        started = time.perf_counter()
+        result = check(transactions)
+
+        self.assertLess(time.perf_counter() - started, 10)
+        self.assertGreaterEqual(result["operations"], 100000)
+        self.assertEqual(sum(result["counts"].values()), 0)
+
+    def test_injected_lost_update_is_g_single(self):
+        transactions = serial_history(10000, 50)
+        lost = Transaction(len(transactions), 0, "ok", [["r", 999, 0.0], ["w", 999, -1.0, 0.0]])
+        overwriting = Transaction(len(transactions) + 1, 1, "ok", [["r", 999, 0.0], ["w", 999, -2.0, -1.0]])
+        transactions += [lost, overwriting]
+
+        result = check(transactions)
+
+        self.assertEqual(result["counts"]["G-single"], 1)
+        self.assertEqual(sorted(result["witnesses"]["G-single"][0][:-1]), [lost.id, overwriting.id])
+
+    def test_aborted_and_intermediate_reads(self):
+        transactions = [
+            Transaction(0, 0, "fail", [["w", 1, 1.0, 0.0]]),
+            Transaction(1, 1, "ok", [["w", 2, 2.0, 0.0], ["w", 2, 3.0, 2.0]]),
+            Transaction(2, 2, "ok", [["r", 1, 1.0], ["r", 2, 2.0]]),
+        ]
+
+        result = check(transactions)
+
+        self.assertEqual(result["counts"]["G1a"], 1)
+        self.assertEqual(result["counts"]["G1b"], 1)
+
+    def test_read_from_indeterminate_writer_is_not_aborted_read(self):
+        transactions = [
+            Transaction(0, 0, "info", [["w", 1, 1.0, 0.0]]),
+            Transaction(1, 1, "ok", [["r", 1, 1.0]]),
+        ]
+
+        result = check(transactions)
+
+        self.assertEqual(sum(result["counts"].values()), 0)
+
+class HistoryRecorderTestCase(PostgresTestCase):
+
+    def test_lost_update_with_read_committed_is_detected(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", ("Mary Castle", 4000))
+                id_employee, = cur.fetchone()
+
+        recorder = HistoryRecorder()
+        scheduler = TransactionScheduler(["t1", "t2", "t1"])
+
+        def transaction1():
+            with self.pool.connection() as conn:
+                with recorder.transaction(conn, 1) as record:
+                    with conn.cursor() as cur:
+                        with scheduler.step():
+                            read_salary(cur, record, id_employee)
+                        with scheduler.step():
+                            write_salary(cur, record, id_employee, recorder.unique_value())
+
+        def transaction2():
+            with self.pool.connection() as conn:
+                with scheduler.step():
+                    with recorder.transaction(conn, 2) as record:
+                        with conn.cursor() as cur:
+                            read_salary(cur, record, id_employee)
+                            write_salary(cur, record, id_employee, recorder.unique_value())
+
+        scheduler.run(t1=transaction1, t2=transaction2)
+        result = check(recorder.transactions)
+
+        self.assertEqual([transaction.status for transaction in recorder.transactions], ["ok", "ok"])
+        self.assertEqual(result["counts"]["G-single"], 1)
+
+    def wait_until_blocked(self, pid, timeout=10):
+        deadline = time.perf_counter() + timeout
+        with self.pool.connection() as conn:
+            while conn.execute("SELECT wait_event_type FROM pg_stat_activity WHERE pid = %s", (pid,)).fetchone() != ("Lock",):
+                if time.perf_counter() > deadline:
+                    self.fail(f"backend {pid} never waited for a lock")
+                time.sleep(0.001)
+
+    def test_read_committed_writers_record_the_value_they_overwrite(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", ("Mary Castle", 4000))
+                id_employee, = cur.fetchone()
+
+        recorder = HistoryRecorder()
+        scheduler = TransactionScheduler(["t1", "t2", "t1"])
+        pids = {}
+
+        def transaction1():
+            with self.pool.connection() as conn:
+                with recorder.transaction(conn, 1) as record:
+                    with conn.cursor() as cur:
+                        with scheduler.step():
+                            write_salary(cur, record, id_employee, recorder.unique_value())
+                        with scheduler.step():
+                            self.wait_until_blocked(pids["t2"])
+
+        def transaction2():
+            with self.pool.connection() as conn:
+                with scheduler.step():
+                    pids["t2"] = conn.info.backend_pid
+                # blocks on t1's row lock until t1 commits
+                with recorder.transaction(conn, 2) as record:
+                    with conn.cursor() as cur:
+                        write_salary(cur, record, id_employee, recorder.unique_value())
+
+        _, errors = scheduler.run(t1=transaction1, t2=transaction2)
+        first, second = ([op[2:] for op in transaction.ops] for transaction in recorder.transactions)
+
+        self.assertEqual(errors, {})
+        self.assertEqual(first, [[1.0, 4000]])
+        self.assertEqual(second, [[2.0, 1.0]])
+        self.assertEqual(sum(check(recorder.transactions)["counts"].values()), 0)
+
+    def test_serializable_workload_has_no_cycles(self):
+        recorder = record_workload(self.connection_uri(), psycopg.IsolationLevel.SERIALIZABLE, 4, 0.5, 5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "history.jsonl")
+            recorder.save(path)
+            result = check(load(path))
+
+        self.assertGreater(result["operations"], 0)
+        self.assertEqual(sum(result["counts"].values()), 0)
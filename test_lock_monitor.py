@@ -0,0 +1,67 @@
+import os
+import re
+import tempfile
+import time
+
+import psycopg
+
+from lock_monitor import ActivitySampler
+from postgres_session import PostgresTestCase
+from scheduler import TransactionScheduler
+
+class ActivitySamplerTestCase(PostgresTestCase):
+
+    def wait_for_event(self, sampler, label, prefix, timeout=10):
+        deadline = time.perf_counter() + timeout
+        while not any(event.startswith(prefix) for transaction in list(sampler.transactions) if transaction.label == label for _, event in list(transaction.events)):
+            if time.perf_counter() > deadline:
+                self.fail(f"sampler never recorded {prefix} for {label}")
+            time.sleep(0.001)
+
+    def test_lock_wait_is_attributed_to_the_blocking_transaction(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("INSERT INTO employee (name, salary) VALUES (%s, %s) RETURNING id", ("Mary Castle", 4000))
+                id_employee, = cur.fetchone()
+
+        with ActivitySampler(self.connection_uri()) as sampler:
+            with psycopg.connect(self.connection_uri()) as conn1, psycopg.connect(self.connection_uri()) as conn2:
+                sampler.label(conn1, "t1")
+                sampler.label(conn2, "t2")
+                scheduler = TransactionScheduler(["t1", "t2", "t1"])
+
+                def transaction1():
+                    with scheduler.step():
+                        conn1.execute("UPDATE employee SET salary = salary * 1.1 WHERE id = %s", (id_employee,))
+                    with scheduler.step():
+                        self.wait_for_event(sampler, "t2", "lock-wait")
+                        conn1.commit()
+
+                def transaction2():
+                    with scheduler.step():
+                        pass
+                    conn2.execute("UPDATE employee SET salary = salary * 1.2 WHERE id = %s", (id_employee,))
+                    conn2.commit()
+
+                _, errors = scheduler.run(t1=transaction1, t2=transaction2)
+                self.wait_for_event(sampler, "t2", "commit")
+
+        self.assertEqual(errors, {})
+        t2, = [transaction for transaction in sampler.transactions if transaction.label == "t2"]
+        events = [event for _, event in t2.events]
+
+        self.assertIn("lock-wait transactionid ShareLock blocked-by t1", events)
+        self.assertLess(events.index("lock-wait transactionid ShareLock blocked-by t1"), events.index("lock-acquired"))
+        self.assertEqual(events[-1], "commit")
+
+        timeline = sampler.timeline()
+        self.assertIn("t2 #1", timeline)
+        self.assertIn("  lock-wait transactionid ShareLock blocked-by t1", timeline)
+        self.assertFalse(any(re.search(r"\d+ms", line) for line in timeline))
+        self.assertTrue(any(re.fullmatch(r"  \+[\d.]+ms lock-acquired waited \d+ms", line) for line in sampler.timeline(timings=True)))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "scenario.timeline")
+            sampler.write(path)
+            with open(path) as file:
+                self.assertEqual(file.read().splitlines(), timeline)
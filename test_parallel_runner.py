@@ -0,0 +1,90 @@
+import io
+import os
+import unittest
+
+from parallel_runner import iterate_tests, needs_exclusive_server, print_report, run_suite
+from postgres_session import session
+
+
+def exclusive(test):
+    test.requires_container = True
+    return test
+
+
+class FakeTests(unittest.TestCase):
+
+    def test_pass(self):
+        session.record_timing("fake worker step", 0.5)
+
+    def test_fail(self):
+        self.fail("expected")
+
+    @exclusive
+    def test_exclusive(self):
+        pass
+
+
+class BrokenSetUpTests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        raise RuntimeError("class fixture failed")
+
+    def test_never_runs(self):
+        pass
+
+
+class ParallelRunnerTestCase(unittest.TestCase):
+
+    def run_fake_suite(self, *cases):
+        suite = unittest.TestSuite(unittest.defaultTestLoader.loadTestsFromTestCase(case) for case in cases)
+        saved = session.take_stats()
+        try:
+            outcomes = run_suite(list(iterate_tests(suite)), 2)
+            stats = session.take_stats()
+        finally:
+            session.merge_stats(saved)
+        return {outcome["id"].rsplit(".", 1)[-1]: outcome for outcome in outcomes}, stats
+
+    def test_splits_exclusive_tests_from_workers(self):
+        tests = {test.id().rsplit(".", 1)[-1]: test for test in iterate_tests(unittest.defaultTestLoader.loadTestsFromTestCase(FakeTests))}
+        self.assertTrue(needs_exclusive_server(tests["test_exclusive"]))
+        self.assertFalse(needs_exclusive_server(tests["test_pass"]))
+
+        outcomes, _ = self.run_fake_suite(FakeTests)
+
+        self.assertEqual({name: outcome["outcome"] for name, outcome in outcomes.items()}, {"test_pass": "ok", "test_fail": "fail", "test_exclusive": "ok"})
+        self.assertEqual(outcomes["test_exclusive"]["pid"], os.getpid())
+        self.assertNotEqual(outcomes["test_pass"]["pid"], os.getpid())
+        self.assertNotEqual(outcomes["test_fail"]["pid"], os.getpid())
+
+    def test_merges_worker_session_stats(self):
+        _, stats = self.run_fake_suite(FakeTests)
+
+        self.assertIn(("fake worker step", 0.5), stats["timings"])
+
+    def test_class_fixture_error_is_timed_from_the_run(self):
+        outcomes, _ = self.run_fake_suite(BrokenSetUpTests)
+
+        (outcome,) = outcomes.values()
+        self.assertEqual(outcome["outcome"], "error")
+        self.assertIn("class fixture failed", outcome["detail"])
+        self.assertLess(outcome["seconds"], 60)
+
+    def test_report_sets_exit_status(self):
+        outcomes, _ = self.run_fake_suite(FakeTests)
+        stream = io.StringIO()
+
+        self.assertFalse(print_report(list(outcomes.values()), 2, 1.0, stream))
+        self.assertIn("FAIL: test_parallel_runner.FakeTests.test_fail", stream.getvalue())
+        self.assertIn("FAILED (fail=1)", stream.getvalue())
+
+        passed = [outcome for name, outcome in outcomes.items() if name != "test_fail"]
+        stream = io.StringIO()
+        self.assertTrue(print_report(passed, 2, 1.0, stream))
+        self.assertIn("Ran 2 tests", stream.getvalue())
+
+
+def load_tests(loader, tests, pattern):
+    # the fake cases only run through run_suite
+    return loader.loadTestsFromTestCase(ParallelRunnerTestCase)
@@ -0,0 +1,15 @@
+from postgres_session import FAST_SETTINGS, PostgresTestCase, session
+
+class ServerProfileTestCase(PostgresTestCase):
+
+    def test_fast_profile_turns_off_durability(self):
+        if session.profile != "fast" or session.local is None and session.container is None:
+            self.skipTest("needs a server started by this session with the fast profile")
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                settings = {}
+                for name in FAST_SETTINGS:
+                    cur.execute(f"SHOW {name}")
+                    settings[name], = cur.fetchone()
+
+        self.assertEqual(settings, FAST_SETTINGS)
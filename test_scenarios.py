@@ -0,0 +1,37 @@
+import unittest
+
+from psycopg import IsolationLevel
+
+from isolation_scenarios import SCENARIOS, lost_update
+from postgres_session import PostgresTestCase
+from scenarios import conflicts, explore, trace_key
+
+class PartialOrderTestCase(unittest.TestCase):
+
+    def test_only_plain_reads_commute(self):
+        self.assertFalse(conflicts("SELECT salary FROM employee", "SELECT SUM(salary) FROM employee"))
+        self.assertTrue(conflicts("SELECT salary FROM employee", "UPDATE employee SET salary = 1"))
+        self.assertTrue(conflicts("SELECT salary FROM employee FOR UPDATE", "SELECT salary FROM employee"))
+        self.assertTrue(conflicts("SELECT salary FROM employee", "COMMIT"))
+
+    def test_commuting_reads_share_a_state(self):
+        scenario = lost_update(IsolationLevel.READ_COMMITTED)
+        statuses = {"t1": "running", "t2": "running"}
+        reads = trace_key(scenario, [("t1", 0), ("t2", 0)], {}, statuses)
+        swapped = trace_key(scenario, [("t2", 0), ("t1", 0)], {}, statuses)
+        writes = trace_key(scenario, [("t1", 0), ("t1", 1), ("t2", 0)], {}, statuses)
+        swapped_writes = trace_key(scenario, [("t2", 0), ("t1", 0), ("t1", 1)], {}, statuses)
+
+        self.assertEqual(reads, swapped)
+        self.assertNotEqual(writes, swapped_writes)
+        self.assertEqual(scenario.interleavings(), 20)
+
+class ScenarioExplorationTestCase(PostgresTestCase):
+
+    def test_declared_scenarios(self):
+        for scenario in SCENARIOS:
+            with self.subTest(scenario=scenario.name):
+                exploration = explore(self.connection_uri(), scenario, workers=4)
+
+                self.assertTrue(exploration.outcomes)
+                self.assertTrue(exploration.passed, [outcome.describe() for outcome in exploration.violations[:3]])
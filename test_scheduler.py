@@ -0,0 +1,52 @@
+import unittest
+
+from scheduler import ScheduleTimeout, TransactionScheduler
+
+class TransactionSchedulerTestCase(unittest.TestCase):
+
+    def test_steps_run_in_schedule_order(self):
+        scheduler = TransactionScheduler(["t2", "t1", "t1", "t2"])
+        executed = []
+
+        def transaction1():
+            for _ in range(2):
+                with scheduler.step():
+                    executed.append("t1")
+
+        def transaction2():
+            for _ in range(2):
+                with scheduler.step():
+                    executed.append("t2")
+
+        scheduler.run(t1=transaction1, t2=transaction2)
+
+        self.assertEqual(executed, ["t2", "t1", "t1", "t2"])
+
+    def test_failed_transaction_releases_its_remaining_steps(self):
+        scheduler = TransactionScheduler(["t1", "t1", "t2"])
+
+        def transaction1():
+            with scheduler.step():
+                raise RuntimeError
+            with scheduler.step():
+                pass
+
+        def transaction2():
+            with scheduler.step():
+                return "done"
+
+        results, errors = scheduler.run(t1=transaction1, t2=transaction2)
+
+        self.assertEqual(results, {"t2": "done"})
+        self.assertEqual(type(errors["t1"]), RuntimeError)
+
+    def test_step_outside_schedule_times_out(self):
+        scheduler = TransactionScheduler(["t1"], timeout=0.1)
+
+        def transaction2():
+            with scheduler.step():
+                pass
+
+        results, errors = scheduler.run(t2=transaction2)
+
+        self.assertEqual(type(errors["t2"]), ScheduleTimeout)
@@ -0,0 +1,69 @@
+from itertools import zip_longest
+import itertools
+import resource
+import time
+
+ITERSIZE = 2000
+MISSING = object()
+
+cursor_names = itertools.count()
+
+
+def peak_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class StreamReport:
+
+    def __init__(self):
+        self.rows = 0
+        self.mismatches = 0
+        self.samples = []
+        self.seconds = 0
+        self.peak_rss_kb = 0
+        self.rss_growth_kb = 0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "mismatches": self.mismatches,
+            "seconds": self.seconds,
+            "rows_per_second": self.rows_per_second,
+            "peak_rss_mb": self.peak_rss_kb / 1024,
+            "rss_growth_mb": self.rss_growth_kb / 1024,
+        }
+
+
+def stream(conn, query, params=None, itersize=ITERSIZE):
+    with conn.cursor(name=f"verify_{next(cursor_names)}") as cur:
+        cur.itersize = itersize
+        cur.execute(query, params)
+        yield from cur
+
+
+def compare_stream(conn, query, expected, params=None, itersize=ITERSIZE, samples=5):
+    report = StreamReport()
+    peak_before = peak_rss_kb()
+    started = time.perf_counter()
+    for actual, wanted in zip_longest(stream(conn, query, params, itersize), expected, fillvalue=MISSING):
+        if actual is not MISSING:
+            report.rows += 1
+        if actual is MISSING or wanted is MISSING or tuple(actual) != tuple(wanted):
+            report.mismatches += 1
+            if len(report.samples) < samples:
+                report.samples.append((None if actual is MISSING else actual, None if wanted is MISSING else wanted))
+    report.seconds = time.perf_counter() - started
+    report.peak_rss_kb = peak_rss_kb()
+    report.rss_growth_kb = report.peak_rss_kb - peak_before
+    return report
+
+
+def table_totals(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT count(*), coalesce(sum(salary), 0) FROM employee")
+        count, total = cur.fetchone()
+    return count, total